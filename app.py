@@ -1,18 +1,47 @@
 import gradio as gr
 import google.generativeai as genai
+from google.generativeai import client as genai_client
 from ddgs import DDGS
-import requests
+import aiohttp
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from bs4 import BeautifulSoup
+try:
+    # selectolax's C parser is much faster than BeautifulSoup; it is optional
+    from selectolax.parser import HTMLParser
+except ImportError:
+    HTMLParser = None
+try:
+    import lxml  # noqa: F401
+    BS4_PARSER = 'lxml'
+except ImportError:
+    BS4_PARSER = 'html.parser'
+import diskcache
+from cachetools import LRUCache, TTLCache
 import time
-from urllib.parse import urlparse
+import threading
+import atexit
+import logging
+from logging.handlers import QueueHandler, QueueListener
+import queue
+import sys
+import math
+from itertools import groupby
+from functools import lru_cache
+from urllib.parse import urlparse, urlsplit, urlunsplit, parse_qsl, urlencode
 import re
-import json
-from typing import List, Dict, Any
+import hashlib
+from html import escape as html_escape
+import io
+from types import MappingProxyType
+from typing import List, Dict, Any, Tuple, Optional, AsyncIterator, Set
 from datetime import datetime
+from dataclasses import dataclass
 import os
+import shutil
 import tempfile
 from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Table, TableStyle
+from reportlab.platypus import BaseDocTemplate, PageTemplate, Frame, Paragraph, Spacer, PageBreak, Table, TableStyle
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.lib import colors
@@ -24,94 +53,213 @@ APP_NAME = "DeepResearchAgent-AI"
 APP_VERSION = "v2.0"
 APP_DESCRIPTION = "Advanced AI-Powered Research Assistant"
 
+# Progress logging is queued and written to stdout by a background listener thread,
+# so the fetch loop and request threads never block on console writes
+log_queue = queue.SimpleQueue()
+logger = logging.getLogger(APP_NAME)
+logger.setLevel(logging.INFO)
+logger.addHandler(QueueHandler(log_queue))
+logger.propagate = False
+log_listener = QueueListener(log_queue, logging.StreamHandler(sys.stdout))
+log_listener.start()
+atexit.register(log_listener.stop)
+
+# HTTP settings for fetching source pages
+REQUEST_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+}
+FETCH_TIMEOUT = aiohttp.ClientTimeout(total=15, sock_connect=3, sock_read=10)
+FETCH_POOL_SIZE = 20  # open connections kept for reuse across fetches
+DNS_CACHE_TTL = 300  # seconds a resolved hostname is reused across fetches
+FETCH_RETRIES = 2
+RETRY_BACKOFF = 0.3  # seconds, doubled after each retry
+RETRY_STATUSES = (502, 503, 504)
+MAX_PAGE_DOWNLOAD_BYTES = 2_000_000  # pages declaring a larger Content-Length are skipped
+MAX_PAGE_READ_BYTES = 512_000  # plenty of HTML for the MAX_SOURCE_CHARS we keep
+MAX_SOURCE_CHARS = 8000  # extracted text kept per page
+FETCH_CONCURRENCY = 10  # pages fetched at the same time
+HOST_REQUEST_INTERVAL = 0.5  # minimum seconds between requests to the same host
+HOST_CONCURRENCY = 2  # pages fetched from the same host at the same time
+HOST_STATE_CACHE_SIZE = 1024  # hosts whose fetch limits are tracked at once
+HOST_STATE_TTL = 10 * 60  # seconds an idle host's fetch limits are kept
+WHITESPACE_RE = re.compile(r'\s+')
+UNWANTED_TAGS = ('script', 'style', 'nav', 'footer', 'header', 'aside', 'iframe', 'noscript')
+SEARCH_WORKERS = 12  # DuckDuckGo queries run at the same time
+
+# Gemini settings
+GEMINI_MODEL_NAME = 'gemini-2.0-flash'
+GEMINI_MODEL_CACHE_SIZE = 32  # API keys whose model and clients are kept ready
+gemini_models: LRUCache = LRUCache(maxsize=GEMINI_MODEL_CACHE_SIZE)  # key fingerprint -> model
+gemini_models_lock = threading.Lock()
+GEMINI_CONCURRENCY = 8  # report generations streaming at once, to stay within the per-minute quota
+gemini_generation_semaphore: Optional[asyncio.Semaphore] = None  # made on the serving loop, see get_gemini_generation_semaphore
+KEY_VALIDATION_TTL = 5 * 60  # seconds a successful key check is trusted without re-asking Gemini
+validated_keys: Dict[bytes, float] = {}  # key fingerprint -> time.monotonic() of the last successful check
+validated_keys_lock = threading.Lock()
+EMBEDDING_MODEL_NAME = 'models/text-embedding-004'
+REPORT_CACHE_KEY = 'semantic_reports_v3'  # entries also carry the key fingerprint and sources
+REPORT_CACHE_SIMILARITY = 0.92  # cosine similarity needed to reuse a report
+REPORT_CACHE_TTL = 24 * 60 * 60
+CURRENT_AFFAIRS_REPORT_CACHE_TTL = 60 * 60
+REPORT_CACHE_MAX_ENTRIES = 200
+
+# Persistent on-disk cache for fetched pages and search results, shared across runs
+CACHE_DIR = '.research_cache'
+PAGE_CACHE_TTL = 24 * 60 * 60  # news and most other sites
+REFERENCE_PAGE_CACHE_TTL = 30 * 24 * 60 * 60  # encyclopedias rarely change
+REFERENCE_DOMAINS = ('wikipedia.org', 'britannica.com')
+SEARCH_CACHE_TTL = 7 * 24 * 60 * 60
+CURRENT_AFFAIRS_SEARCH_CACHE_TTL = 6 * 60 * 60
+
+research_cache = diskcache.Cache(CACHE_DIR, size_limit=2**30, eviction_policy='least-recently-used')
+research_cache.stats(enable=True)
+
+# Recently fetched pages are also held in memory, so overlapping runs skip the disk read and unpickling
+PAGE_MEMORY_CACHE_SIZE = 512
+PAGE_MEMORY_CACHE_TTL = 15 * 60
+page_memory_cache = TTLCache(maxsize=PAGE_MEMORY_CACHE_SIZE, ttl=PAGE_MEMORY_CACHE_TTL)
+page_memory_cache_lock = threading.Lock()
+
+def cache_ttl_for_url(url: str) -> int:
+    """Get how long a fetched page may be cached, based on how often its site changes"""
+    host = urlparse(url).netloc.lower()
+    if any(host == domain or host.endswith('.' + domain) for domain in REFERENCE_DOMAINS):
+        return REFERENCE_PAGE_CACHE_TTL
+    return PAGE_CACHE_TTL
+
+def search_cache_ttl_for_topic(topic_type: str) -> int:
+    """Get how long search results may be cached; news goes stale quickly, so current affairs expire sooner"""
+    return CURRENT_AFFAIRS_SEARCH_CACHE_TTL if topic_type == 'current_affairs' else SEARCH_CACHE_TTL
+
+def get_cache_stats() -> Dict[str, int]:
+    """Get hit/miss counts for the research cache"""
+    hits, misses = research_cache.stats()
+    return {"hits": hits, "misses": misses}
+
+# Topic categories in priority order, with the keywords that identify them
+TOPIC_CATEGORY_KEYWORDS = (
+    ('politics', ('politics', 'political', 'government', 'policy', 'election', 'democracy', 'parliament', 'congress', 'senate', 'president', 'minister', 'geopolitics', 'diplomacy', 'foreign policy', 'international relations')),
+    ('history', ('history', 'historical', 'ancient', 'medieval', 'world war', 'civilization', 'empire', 'dynasty', 'revolution', 'century', 'era', 'timeline', 'past', 'heritage')),
+    ('geography', ('geography', 'geographical', 'country', 'continent', 'ocean', 'mountain', 'river', 'climate', 'population', 'capital', 'border', 'region', 'territory', 'map')),
+    ('current_affairs', ('current', 'news', 'today', 'recent', 'latest', 'breaking', 'update', 'happening', '2024', '2025', 'this year', 'now')),
+    ('technology', ('technology', 'tech', 'ai', 'artificial intelligence', 'machine learning', 'software', 'hardware', 'computer', 'digital', 'programming', 'coding', 'algorithm', 'data science', 'cybersecurity')),
+    ('war', ('war', 'warfare', 'conflict', 'battle', 'military', 'army', 'defense', 'weapon', 'strategy', 'combat', 'invasion', 'occupation', 'siege')),
+    ('economics', ('economy', 'economic', 'finance', 'financial', 'market', 'trade', 'business', 'industry', 'company', 'corporation', 'gdp', 'inflation', 'recession')),
+    ('science', ('science', 'scientific', 'research', 'study', 'experiment', 'discovery', 'innovation', 'physics', 'chemistry', 'biology', 'medicine', 'health')),
+)
+
+# One compiled whole-word pattern per category, so detection is a single regex scan per category.
+# Plurals ("wars", "computers", "markets") still count as their keyword.
+TOPIC_PATTERNS = tuple(
+    (category, re.compile(r'\b(?:' + '|'.join(map(re.escape, keywords)) + r')(?:e?s)?\b', re.IGNORECASE))
+    for category, keywords in TOPIC_CATEGORY_KEYWORDS
+)
+
 # Enhanced topic detection and search helper functions
 def detect_topic_category(query: str) -> str:
     """Detect the category of research topic for specialized search strategies"""
-    politics_keywords = ['politics', 'political', 'government', 'policy', 'election', 'democracy', 'parliament', 'congress', 'senate', 'president', 'minister', 'geopolitics', 'diplomacy', 'foreign policy', 'international relations']
-    history_keywords = ['history', 'historical', 'ancient', 'medieval', 'world war', 'civilization', 'empire', 'dynasty', 'revolution', 'century', 'era', 'timeline', 'past', 'heritage']
-    geography_keywords = ['geography', 'geographical', 'country', 'continent', 'ocean', 'mountain', 'river', 'climate', 'population', 'capital', 'border', 'region', 'territory', 'map']
-    current_affairs_keywords = ['current', 'news', 'today', 'recent', 'latest', 'breaking', 'update', 'happening', '2024', '2025', 'this year', 'now']
-    technology_keywords = ['technology', 'tech', 'ai', 'artificial intelligence', 'machine learning', 'software', 'hardware', 'computer', 'digital', 'programming', 'coding', 'algorithm', 'data science', 'cybersecurity']
-    war_keywords = ['war', 'warfare', 'conflict', 'battle', 'military', 'army', 'defense', 'weapon', 'strategy', 'combat', 'invasion', 'occupation', 'siege']
-    economics_keywords = ['economy', 'economic', 'finance', 'financial', 'market', 'trade', 'business', 'industry', 'company', 'corporation', 'gdp', 'inflation', 'recession']
-    science_keywords = ['science', 'scientific', 'research', 'study', 'experiment', 'discovery', 'innovation', 'physics', 'chemistry', 'biology', 'medicine', 'health']
-    
-    query_lower = query.lower()
-    
-    if any(keyword in query_lower for keyword in politics_keywords):
-        return 'politics'
-    elif any(keyword in query_lower for keyword in history_keywords):
-        return 'history'
-    elif any(keyword in query_lower for keyword in geography_keywords):
-        return 'geography'
-    elif any(keyword in query_lower for keyword in current_affairs_keywords):
-        return 'current_affairs'
-    elif any(keyword in query_lower for keyword in technology_keywords):
-        return 'technology'
-    elif any(keyword in query_lower for keyword in war_keywords):
-        return 'war'
-    elif any(keyword in query_lower for keyword in economics_keywords):
-        return 'economics'
-    elif any(keyword in query_lower for keyword in science_keywords):
-        return 'science'
-    else:
-        return 'general'
+    for category, pattern in TOPIC_PATTERNS:
+        if pattern.search(query):
+            return category
+    return 'general'
+
+# Topic-to-domain and topic-to-keyword tables, built once and read-only so callers can't mutate them.
+# Entries that are identical in the search and ranking tables share one tuple.
+CURRENT_AFFAIRS_DOMAINS = ('reuters.com', 'bbc.com', 'cnn.com', 'ap.org', 'npr.org', 'aljazeera.com', 'theguardian.com', 'nytimes.com')
+GEOGRAPHY_DOMAINS = ('nationalgeographic.com', 'worldatlas.com', 'britannica.com', 'cia.gov', 'worldbank.org', 'un.org')
+ECONOMICS_DOMAINS = ('reuters.com', 'bloomberg.com', 'economist.com', 'ft.com', 'worldbank.org', 'imf.org', 'federalreserve.gov')
+SCIENCE_DOMAINS = ('nature.com', 'sciencemag.org', 'scientificamerican.com', 'newscientist.com', 'pnas.org', 'cell.com')
+
+SPECIALIZED_DOMAINS = MappingProxyType({
+    'politics': ('reuters.com', 'bbc.com', 'cnn.com', 'politico.com', 'foreignaffairs.com', 'cfr.org', 'brookings.edu', 'csis.org'),
+    'history': ('britannica.com', 'history.com', 'nationalgeographic.com', 'smithsonianmag.com', 'historynet.com', 'worldhistory.org'),
+    'geography': GEOGRAPHY_DOMAINS,
+    'current_affairs': CURRENT_AFFAIRS_DOMAINS,
+    'technology': ('techcrunch.com', 'wired.com', 'ars-technica.com', 'ieee.org', 'nature.com', 'sciencemag.org', 'mit.edu', 'stanford.edu'),
+    'war': ('janes.com', 'defensenews.com', 'militarytimes.com', 'csis.org', 'rand.org', 'stratfor.com'),
+    'economics': ECONOMICS_DOMAINS,
+    'science': SCIENCE_DOMAINS,
+    'general': ('wikipedia.org', 'britannica.com', 'reuters.com', 'bbc.com', 'cnn.com')
+})
+
+TOPIC_KEYWORDS = MappingProxyType({
+    'politics': ('analysis', 'policy', 'government', 'official', 'statement', 'report', 'briefing', 'summit', 'debate', 'legislation'),
+    'history': ('timeline', 'chronology', 'facts', 'documented', 'archive', 'primary source', 'historian', 'evidence', 'analysis', 'context'),
+    'geography': ('facts', 'statistics', 'data', 'demographic', 'topography', 'atlas', 'survey', 'official', 'census', 'coordinates'),
+    'current_affairs': ('breaking', 'latest', 'update', 'developing', 'live', 'recent', 'today', 'headlines', 'news', 'report'),
+    'technology': ('innovation', 'breakthrough', 'development', 'advancement', 'research', 'cutting-edge', 'emerging', 'trend', 'future', 'application'),
+    'war': ('analysis', 'strategy', 'tactics', 'intelligence', 'assessment', 'report', 'conflict', 'situation', 'update', 'briefing'),
+    'economics': ('analysis', 'forecast', 'data', 'statistics', 'trend', 'market', 'report', 'outlook', 'indicator', 'growth'),
+    'science': ('research', 'study', 'discovery', 'breakthrough', 'publication', 'peer-reviewed', 'journal', 'findings', 'methodology', 'evidence'),
+    'general': ('information', 'facts', 'comprehensive', 'detailed', 'overview', 'guide', 'explanation', 'analysis', 'summary', 'background')
+})
+
+PRIORITY_DOMAINS = MappingProxyType({
+    'politics': ('reuters.com', 'bbc.com', 'cnn.com', 'politico.com', 'foreignaffairs.com', 'cfr.org', 'brookings.edu', 'apnews.com'),
+    'history': ('britannica.com', 'history.com', 'nationalgeographic.com', 'smithsonianmag.com', 'worldhistory.org', 'historynet.com'),
+    'geography': GEOGRAPHY_DOMAINS,
+    'current_affairs': CURRENT_AFFAIRS_DOMAINS,
+    'technology': ('techcrunch.com', 'wired.com', 'ars-technica.com', 'ieee.org', 'nature.com', 'mit.edu', 'stanford.edu', 'acm.org'),
+    'war': ('janes.com', 'defensenews.com', 'csis.org', 'rand.org', 'stratfor.com', 'cfr.org'),
+    'economics': ECONOMICS_DOMAINS,
+    'science': SCIENCE_DOMAINS,
+    'general': ('wikipedia.org', 'britannica.com', 'reuters.com', 'bbc.com', 'cnn.com', 'nationalgeographic.com')
+})
+
+# Relevance checks scan page content in one pass per term list: a lowercase term tuple and a
+# lookahead alternation of its terms, longest first, so overlapping terms are all seen
+TermMatcher = Tuple[re.Pattern, Tuple[str, ...]]
+
+def compile_term_matcher(terms) -> TermMatcher:
+    """Compile distinct lowercase terms into a case-insensitive lookahead alternation"""
+    terms = tuple(sorted(set(term.lower() for term in terms), key=len, reverse=True))
+    return re.compile('(?=(' + '|'.join(map(re.escape, terms)) + '))', re.IGNORECASE), terms
+
+TOPIC_KEYWORD_MATCHERS = MappingProxyType({
+    topic_type: compile_term_matcher(keywords)
+    for topic_type, keywords in TOPIC_KEYWORDS.items()
+})
+
+# Social and user-generated content sites that rarely make good research sources
+LOW_QUALITY_DOMAINS = frozenset({'pinterest.com', 'instagram.com', 'facebook.com', 'twitter.com', 'tiktok.com', 'reddit.com'})
+
+# Check whether a hostname is one of the given domains or a subdomain of one (www., m., old., ...)
+def host_in_domains(host: str, domains: frozenset) -> bool:
+    """Match a hostname against a domain set by looking up it and each parent domain"""
+    while host:
+        if host in domains:
+            return True
+        _, _, host = host.partition('.')
+    return False
+
+# Search result titles that carry no information about the page
+GENERIC_TITLES = frozenset({'no title', 'untitled', 'page not found'})
 
-def get_specialized_domains(topic_type: str) -> List[str]:
+def get_specialized_domains(topic_type: str) -> Tuple[str, ...]:
     """Get specialized domains based on topic category"""
-    domain_mapping = {
-        'politics': ['reuters.com', 'bbc.com', 'cnn.com', 'politico.com', 'foreignaffairs.com', 'cfr.org', 'brookings.edu', 'csis.org'],
-        'history': ['britannica.com', 'history.com', 'nationalgeographic.com', 'smithsonianmag.com', 'historynet.com', 'worldhistory.org'],
-        'geography': ['nationalgeographic.com', 'worldatlas.com', 'britannica.com', 'cia.gov', 'worldbank.org', 'un.org'],
-        'current_affairs': ['reuters.com', 'bbc.com', 'cnn.com', 'ap.org', 'npr.org', 'aljazeera.com', 'theguardian.com', 'nytimes.com'],
-        'technology': ['techcrunch.com', 'wired.com', 'ars-technica.com', 'ieee.org', 'nature.com', 'sciencemag.org', 'mit.edu', 'stanford.edu'],
-        'war': ['janes.com', 'defensenews.com', 'militarytimes.com', 'csis.org', 'rand.org', 'stratfor.com'],
-        'economics': ['reuters.com', 'bloomberg.com', 'economist.com', 'ft.com', 'worldbank.org', 'imf.org', 'federalreserve.gov'],
-        'science': ['nature.com', 'sciencemag.org', 'scientificamerican.com', 'newscientist.com', 'pnas.org', 'cell.com'],
-        'general': ['wikipedia.org', 'britannica.com', 'reuters.com', 'bbc.com', 'cnn.com']
-    }
-    return domain_mapping.get(topic_type, domain_mapping['general'])
+    return SPECIALIZED_DOMAINS.get(topic_type, SPECIALIZED_DOMAINS['general'])
 
-def get_topic_keywords(query: str, topic_type: str) -> List[str]:
+def get_topic_keywords(query: str, topic_type: str) -> Tuple[str, ...]:
     """Get enhanced keywords based on topic category"""
-    keyword_mapping = {
-        'politics': ['analysis', 'policy', 'government', 'official', 'statement', 'report', 'briefing', 'summit', 'debate', 'legislation'],
-        'history': ['timeline', 'chronology', 'facts', 'documented', 'archive', 'primary source', 'historian', 'evidence', 'analysis', 'context'],
-        'geography': ['facts', 'statistics', 'data', 'demographic', 'topography', 'atlas', 'survey', 'official', 'census', 'coordinates'],
-        'current_affairs': ['breaking', 'latest', 'update', 'developing', 'live', 'recent', 'today', 'headlines', 'news', 'report'],
-        'technology': ['innovation', 'breakthrough', 'development', 'advancement', 'research', 'cutting-edge', 'emerging', 'trend', 'future', 'application'],
-        'war': ['analysis', 'strategy', 'tactics', 'intelligence', 'assessment', 'report', 'conflict', 'situation', 'update', 'briefing'],
-        'economics': ['analysis', 'forecast', 'data', 'statistics', 'trend', 'market', 'report', 'outlook', 'indicator', 'growth'],
-        'science': ['research', 'study', 'discovery', 'breakthrough', 'publication', 'peer-reviewed', 'journal', 'findings', 'methodology', 'evidence'],
-        'general': ['information', 'facts', 'comprehensive', 'detailed', 'overview', 'guide', 'explanation', 'analysis', 'summary', 'background']
-    }
-    return keyword_mapping.get(topic_type, keyword_mapping['general'])
+    return TOPIC_KEYWORDS.get(topic_type, TOPIC_KEYWORDS['general'])
 
-def get_priority_domains_for_topic(topic_type: str) -> List[str]:
+def get_priority_domains_for_topic(topic_type: str) -> Tuple[str, ...]:
     """Get priority domains for result ranking based on topic"""
-    priority_mapping = {
-        'politics': ['reuters.com', 'bbc.com', 'cnn.com', 'politico.com', 'foreignaffairs.com', 'cfr.org', 'brookings.edu', 'apnews.com'],
-        'history': ['britannica.com', 'history.com', 'nationalgeographic.com', 'smithsonianmag.com', 'worldhistory.org', 'historynet.com'],
-        'geography': ['nationalgeographic.com', 'worldatlas.com', 'britannica.com', 'cia.gov', 'worldbank.org', 'un.org'],
-        'current_affairs': ['reuters.com', 'bbc.com', 'cnn.com', 'ap.org', 'npr.org', 'aljazeera.com', 'theguardian.com', 'nytimes.com'],
-        'technology': ['techcrunch.com', 'wired.com', 'ars-technica.com', 'ieee.org', 'nature.com', 'mit.edu', 'stanford.edu', 'acm.org'],
-        'war': ['janes.com', 'defensenews.com', 'csis.org', 'rand.org', 'stratfor.com', 'cfr.org'],
-        'economics': ['reuters.com', 'bloomberg.com', 'economist.com', 'ft.com', 'worldbank.org', 'imf.org', 'federalreserve.gov'],
-        'science': ['nature.com', 'sciencemag.org', 'scientificamerican.com', 'newscientist.com', 'pnas.org', 'cell.com'],
-        'general': ['wikipedia.org', 'britannica.com', 'reuters.com', 'bbc.com', 'cnn.com', 'nationalgeographic.com']
-    }
-    return priority_mapping.get(topic_type, priority_mapping['general'])
+    return PRIORITY_DOMAINS.get(topic_type, PRIORITY_DOMAINS['general'])
+
+# Characters that are invalid in Windows/Unix filenames, plus underscores so runs collapse in the same pass
+INVALID_FILENAME_RE = re.compile(r'[<>:"/\\|?*_]+')
 
 # Sanitize filename for safe file creation
 def sanitize_filename(filename: str) -> str:
     """Sanitize filename to remove invalid characters for Windows/Unix systems"""
-    # Remove or replace invalid characters
-    invalid_chars = '<>:"/\\|?*'
-    for char in invalid_chars:
-        filename = filename.replace(char, '_')
-    
-    # Remove multiple consecutive underscores and trim
-    filename = re.sub(r'_+', '_', filename)
+    # Replace runs of invalid characters and underscores with a single underscore, then trim
+    filename = INVALID_FILENAME_RE.sub('_', filename)
     filename = filename.strip('_')
     
     # Limit length to prevent issues
@@ -127,58 +275,144 @@ def sanitize_filename(filename: str) -> str:
     
     return filename
 
+# PDF styles are built once at import instead of on every report (and every line)
+def build_pdf_styles() -> Dict[str, ParagraphStyle]:
+    """Build the paragraph styles used by the PDF report"""
+    styles = getSampleStyleSheet()
+    
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=24,
+        textColor=colors.HexColor('#2C3E50'),
+        spaceAfter=30,
+        alignment=TA_CENTER,
+        fontName='Helvetica-Bold'
+    )
+    
+    subtitle_style = ParagraphStyle(
+        'CustomSubtitle',
+        parent=styles['Heading2'],
+        fontSize=14,
+        textColor=colors.HexColor('#34495E'),
+        spaceAfter=20,
+        alignment=TA_CENTER
+    )
+    
+    header_style = ParagraphStyle(
+        'CustomHeader',
+        parent=styles['Heading2'],
+        fontSize=16,
+        textColor=colors.HexColor('#2980B9'),
+        spaceAfter=12,
+        spaceBefore=20,
+        fontName='Helvetica-Bold'
+    )
+    
+    body_style = ParagraphStyle(
+        'CustomBody',
+        parent=styles['Normal'],
+        fontSize=11,
+        textColor=colors.HexColor('#2C3E50'),
+        spaceAfter=6,
+        alignment=TA_LEFT,
+        leading=14
+    )
+    
+    source_style = ParagraphStyle(
+        'Source',
+        parent=body_style,
+        fontSize=10,
+        leftIndent=10,
+        spaceAfter=8
+    )
+    
+    return {
+        'title': title_style,
+        'subtitle': subtitle_style,
+        'header': header_style,
+        'body': body_style,
+        'header3': ParagraphStyle(
+            'Header3',
+            parent=header_style,
+            fontSize=14,
+            textColor=colors.HexColor('#7F8C8D')
+        ),
+        'bold': ParagraphStyle(
+            'Bold',
+            parent=body_style,
+            fontName='Helvetica-Bold'
+        ),
+        'bullet': ParagraphStyle(
+            'Bullet',
+            parent=body_style,
+            leftIndent=20,
+            bulletIndent=10,
+            bulletText='•',
+            bulletColor=colors.HexColor('#3498DB')
+        ),
+        'source': source_style,
+        'url': ParagraphStyle(
+            'URL',
+            parent=source_style,
+            fontSize=9,
+            textColor=colors.HexColor('#3498DB'),
+            leftIndent=20
+        ),
+        'footer': ParagraphStyle(
+            'Footer',
+            parent=styles['Normal'],
+            fontSize=10,
+            textColor=colors.HexColor('#7F8C8D'),
+            alignment=TA_CENTER
+        ),
+    }
+
+PDF_STYLES = build_pdf_styles()
+
+# Line-level markdown syntax: headings, whole-line bold and bullets
+MARKDOWN_LINE_RE = re.compile(r'(?P<h1># )|(?P<h2>## )|(?P<h3>### )|(?P<bold>\*\*(?=.*\*\*$))|(?P<bullet>[-*] )')
+MARKDOWN_LINE_STYLES = {'h1': 'header', 'h2': 'header', 'h3': 'header3', 'bullet': 'bullet'}
+
+# Inline markdown formatting converted to ReportLab markup
+MARKDOWN_BOLD_RE = re.compile(r'\*\*(.*?)\*\*')
+MARKDOWN_ITALIC_RE = re.compile(r'\*(.*?)\*')
+
+# A fetched research source; slots keep the per-source footprint small
+@dataclass
+class Source:
+    # Declared by hand: dataclass(slots=True) needs Python 3.10
+    __slots__ = ('title', 'url', 'content', 'topic_type')
+    title: str
+    url: str
+    content: str
+    topic_type: str
+
+# Markdown file for download
+def write_markdown_report(content: str, report_dir: str, filename: str) -> Optional[str]:
+    """Write the markdown report into the run's report directory and return its path"""
+    try:
+        md_path = os.path.join(report_dir, filename)
+        # One buffered write; Gradio then serves the file directly on download
+        with open(md_path, 'w', encoding='utf-8', buffering=1 << 16) as md_file:
+            md_file.write(content)
+        return md_path
+    except Exception as e:
+        logger.error(f"Markdown file error: {e}")
+        return None
+
 # PDF Generation Function
-def create_pdf_report(content: str, topic: str, sources: List[Dict], filename: str) -> str:
+def create_pdf_report(content: str, topic: str, sources: List[Source], report_dir: str, filename: str) -> str:
     """Create a professional PDF report from markdown content"""
     try:
-        # Create temporary PDF file
-        temp_dir = tempfile.gettempdir()
-        pdf_path = os.path.join(temp_dir, filename.replace('.md', '.pdf'))
+        # Create the PDF next to the run's markdown file
+        pdf_path = os.path.join(report_dir, filename.replace('.md', '.pdf'))
         
-        # Create PDF document
-        doc = SimpleDocTemplate(pdf_path, pagesize=A4, topMargin=1*inch, bottomMargin=1*inch)
-        styles = getSampleStyleSheet()
         story = []
-        
-        # Custom styles
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=24,
-            textColor=colors.HexColor('#2C3E50'),
-            spaceAfter=30,
-            alignment=TA_CENTER,
-            fontName='Helvetica-Bold'
-        )
-        
-        subtitle_style = ParagraphStyle(
-            'CustomSubtitle',
-            parent=styles['Heading2'],
-            fontSize=14,
-            textColor=colors.HexColor('#34495E'),
-            spaceAfter=20,
-            alignment=TA_CENTER
-        )
-        
-        header_style = ParagraphStyle(
-            'CustomHeader',
-            parent=styles['Heading2'],
-            fontSize=16,
-            textColor=colors.HexColor('#2980B9'),
-            spaceAfter=12,
-            spaceBefore=20,
-            fontName='Helvetica-Bold'
-        )
-        
-        body_style = ParagraphStyle(
-            'CustomBody',
-            parent=styles['Normal'],
-            fontSize=11,
-            textColor=colors.HexColor('#2C3E50'),
-            spaceAfter=6,
-            alignment=TA_LEFT,
-            leading=14
-        )
+        title_style = PDF_STYLES['title']
+        subtitle_style = PDF_STYLES['subtitle']
+        header_style = PDF_STYLES['header']
+        body_style = PDF_STYLES['body']
         
         # Header Section
         story.append(Paragraph(APP_NAME, title_style))
@@ -218,49 +452,26 @@ def create_pdf_report(content: str, topic: str, sources: List[Dict], filename: s
         story.append(Spacer(1, 0.1*inch))
         
         # Process markdown content
-        lines = content.split('\n')
-        for line in lines:
-            line = line.strip()
-            if not line:
-                story.append(Spacer(1, 6))
+        lines = [line.strip() for line in content.split('\n')]
+        for is_blank, group in groupby(lines, key=lambda line: not line):
+            if is_blank:
+                # One spacer per run of blank lines, capped at three lines' worth
+                story.append(Spacer(1, 6 * min(sum(1 for _ in group), 3)))
                 continue
-                
-            if line.startswith('# '):
-                story.append(Paragraph(line[2:], header_style))
-            elif line.startswith('## '):
-                story.append(Paragraph(line[3:], header_style))
-            elif line.startswith('### '):
-                header_3_style = ParagraphStyle(
-                    'Header3',
-                    parent=header_style,
-                    fontSize=14,
-                    textColor=colors.HexColor('#7F8C8D')
-                )
-                story.append(Paragraph(line[4:], header_3_style))
-            elif line.startswith('**') and line.endswith('**'):
-                bold_style = ParagraphStyle(
-                    'Bold',
-                    parent=body_style,
-                    fontName='Helvetica-Bold'
-                )
-                story.append(Paragraph(line[2:-2], bold_style))
-            elif line.startswith('- ') or line.startswith('* '):
-                bullet_style = ParagraphStyle(
-                    'Bullet',
-                    parent=body_style,
-                    leftIndent=20,
-                    bulletIndent=10,
-                    bulletText='•',
-                    bulletColor=colors.HexColor('#3498DB')
-                )
-                story.append(Paragraph(line[2:], bullet_style))
-            elif line.startswith(('1. ', '2. ', '3. ', '4. ', '5. ')):
-                story.append(Paragraph(line, body_style))
-            else:
-                # Clean basic markdown formatting
-                line = re.sub(r'\*\*(.*?)\*\*', r'<b>\1</b>', line)
-                line = re.sub(r'\*(.*?)\*', r'<i>\1</i>', line)
-                story.append(Paragraph(line, body_style))
+            
+            for line in group:
+                # One anchored regex match classifies the line instead of a chain of startswith checks
+                match = MARKDOWN_LINE_RE.match(line)
+                kind = match.lastgroup if match else None
+                if kind == 'bold':
+                    story.append(Paragraph(line[2:-2], PDF_STYLES['bold']))
+                elif kind:
+                    story.append(Paragraph(line[match.end():], PDF_STYLES[MARKDOWN_LINE_STYLES[kind]]))
+                else:
+                    # Clean basic markdown formatting
+                    line = MARKDOWN_BOLD_RE.sub(r'<b>\1</b>', line)
+                    line = MARKDOWN_ITALIC_RE.sub(r'<i>\1</i>', line)
+                    story.append(Paragraph(line, body_style))
         
         # Footer section
         story.append(PageBreak())
@@ -268,45 +479,130 @@ def create_pdf_report(content: str, topic: str, sources: List[Dict], filename: s
         
         if sources:
             for i, source in enumerate(sources[:10], 1):  # Limit to 10 sources
-                source_style = ParagraphStyle(
-                    'Source',
-                    parent=body_style,
-                    fontSize=10,
-                    leftIndent=10,
-                    spaceAfter=8
-                )
-                title = source.get('title', 'No Title')[:100]
-                url = source.get('url', '')
-                story.append(Paragraph(f"{i}. {title}", source_style))
+                title = (source.title or 'No Title')[:100]
+                url = source.url
+                story.append(Paragraph(f"{i}. {title}", PDF_STYLES['source']))
                 if url:
-                    url_style = ParagraphStyle(
-                        'URL',
-                        parent=source_style,
-                        fontSize=9,
-                        textColor=colors.HexColor('#3498DB'),
-                        leftIndent=20
-                    )
-                    story.append(Paragraph(url, url_style))
+                    story.append(Paragraph(url, PDF_STYLES['url']))
         
         # Footer
         story.append(Spacer(1, 0.5*inch))
-        footer_style = ParagraphStyle(
-            'Footer',
-            parent=styles['Normal'],
-            fontSize=10,
-            textColor=colors.HexColor('#7F8C8D'),
-            alignment=TA_CENTER
-        )
-        story.append(Paragraph(f"Generated by {APP_NAME} {APP_VERSION} | Advanced AI Research Assistant", footer_style))
-        
-        # Build PDF
-        doc.build(story)
+        story.append(Paragraph(f"Generated by {APP_NAME} {APP_VERSION} | Advanced AI Research Assistant", PDF_STYLES['footer']))
+        
+        # Build PDF straight into the output file through a 64 KB buffer
+        with open(pdf_path, 'wb', buffering=1 << 16) as pdf_file:
+            doc = BaseDocTemplate(pdf_file, pagesize=A4, topMargin=1*inch, bottomMargin=1*inch)
+            frame = Frame(doc.leftMargin, doc.bottomMargin, doc.width, doc.height, id='content')
+            doc.addPageTemplates([PageTemplate(id='report', frames=[frame])])
+            doc.build(story)
         return pdf_path
         
     except Exception as e:
-        print(f"PDF generation error: {e}")
+        logger.error(f"PDF generation error: {e}")
         return None
 
+# Keys are cached by digest so the raw key is never used as a cache key
+def api_key_fingerprint(api_key: str) -> bytes:
+    """Get a short, stable, non-reversible identifier for an API key"""
+    return hashlib.blake2b(api_key.encode('utf-8'), digest_size=16).digest()
+
+# Gemini model clients are expensive to set up, so keep one per API key.
+# genai.configure is process-wide and the SDK picks its client up lazily, so each model is bound to
+# its own key's client while that key is configured; later calls keep using it even after another
+# user's key has been configured.
+def get_gemini_model(api_key: str) -> genai.GenerativeModel:
+    """Get the Gemini model for an API key, configuring and creating it on first use"""
+    fingerprint = api_key_fingerprint(api_key)
+    with gemini_models_lock:
+        model = gemini_models.get(fingerprint)
+        if model is None:
+            genai.configure(api_key=api_key)
+            model = genai.GenerativeModel(GEMINI_MODEL_NAME)
+            model._client = genai_client.get_default_generative_client()
+            gemini_models[fingerprint] = model
+        return model
+
+# The async client can only be created on a running event loop, so it is bound on first async use
+def bind_async_gemini_client(model: genai.GenerativeModel, api_key: str) -> None:
+    """Give a cached model an async client for its own API key"""
+    with gemini_models_lock:
+        if model._async_client is None:
+            genai.configure(api_key=api_key)
+            model._async_client = genai_client.get_default_generative_async_client()
+
+def forget_gemini_model(api_key: str) -> None:
+    """Drop the cached model for an API key that turned out not to work"""
+    with gemini_models_lock:
+        gemini_models.pop(api_key_fingerprint(api_key), None)
+
+# Semantic report cache: queries are embedded, and a new query from the same API key whose embedding
+# is close enough to a recent one reuses that report and its sources without researching again.
+# Entries are (key fingerprint, unit vector, report, ((title, url), ...), topic type, expires_at) and hold
+# only builtin types, so unpickling them never depends on this module's classes or how it was started.
+def load_report_cache() -> List[Tuple[bytes, List[float], str, Tuple[Tuple[str, str], ...], str, float]]:
+    """Load unexpired semantic cache entries saved by earlier sessions"""
+    now = time.time()
+    try:
+        return [entry for entry in research_cache.get(REPORT_CACHE_KEY, []) if entry[-1] > now]
+    except Exception as e:
+        # An unreadable cache must not stop the app from starting; the reports are simply generated again
+        logger.warning(f"Discarding unreadable semantic report cache: {e}")
+        research_cache.delete(REPORT_CACHE_KEY)
+        return []
+
+report_cache_entries = load_report_cache()
+report_cache_lock = threading.Lock()
+
+def embed_query(query: str, model: genai.GenerativeModel) -> List[float]:
+    """Embed a research query as a unit-length vector, so a dot product gives cosine similarity"""
+    # Use the client bound to the caller's key rather than whichever key was configured last
+    embedding = genai.embed_content(model=EMBEDDING_MODEL_NAME, content=query, task_type='semantic_similarity', client=model._client)['embedding']
+    norm = math.sqrt(sum(value * value for value in embedding)) or 1.0
+    return [value / norm for value in embedding]
+
+def has_cached_reports(fingerprint: bytes) -> bool:
+    """Check whether an API key has any unexpired cached reports, so a lookup needs no embedding otherwise"""
+    now = time.time()
+    with report_cache_lock:
+        return any(entry[0] == fingerprint and entry[-1] > now for entry in report_cache_entries)
+
+def find_cached_report(query_vector: List[float], fingerprint: bytes) -> Optional[Tuple[str, List[Source]]]:
+    """Get the cached report and sources for the key's most similar recent query, if it is similar enough"""
+    now = time.time()
+    best_score, best_entry = 0.0, None
+    with report_cache_lock:
+        for owner, vector, report, sources, topic_type, expires_at in report_cache_entries:
+            if owner != fingerprint or expires_at <= now:
+                continue
+            score = sum(a * b for a, b in zip(query_vector, vector))
+            if score > best_score:
+                best_score, best_entry = score, (report, sources, topic_type)
+    if best_score < REPORT_CACHE_SIMILARITY:
+        return None
+    report, sources, topic_type = best_entry
+    return report, [Source(title, url, '', topic_type) for title, url in sources]
+
+def cache_report(query_vector: List[float], fingerprint: bytes, report: str, sources: List[Source], topic_type: str) -> None:
+    """Remember a generated report with its sources and persist the semantic cache for later sessions"""
+    ttl = CURRENT_AFFAIRS_REPORT_CACHE_TTL if topic_type == 'current_affairs' else REPORT_CACHE_TTL
+    # The PDF only lists source titles and URLs, so the page text is not kept
+    source_links = tuple((source.title, source.url) for source in sources)
+    now = time.time()
+    with report_cache_lock:
+        report_cache_entries[:] = [entry for entry in report_cache_entries if entry[-1] > now]
+        report_cache_entries.append((fingerprint, query_vector, report, source_links, topic_type, now + ttl))
+        del report_cache_entries[:-REPORT_CACHE_MAX_ENTRIES]
+        research_cache.set(REPORT_CACHE_KEY, report_cache_entries, expire=REPORT_CACHE_TTL)
+
+# Successful validations are remembered for KEY_VALIDATION_TTL seconds
+def remember_valid_key(fingerprint: bytes) -> None:
+    """Record a successful key check, dropping checks that have expired"""
+    now = time.monotonic()
+    with validated_keys_lock:
+        for stale in [key for key, checked_at in validated_keys.items() if now - checked_at >= KEY_VALIDATION_TTL]:
+            del validated_keys[stale]
+        validated_keys[fingerprint] = now
+
 # Validate Gemini API key
 def validate_api_key(api_key: str) -> tuple[bool, str]:
     """Validate if the Gemini API key is working"""
@@ -322,18 +618,27 @@ def validate_api_key(api_key: str) -> tuple[bool, str]:
     if not api_key.replace('-', '').replace('_', '').isalnum():
         return False, "❌ API key contains invalid characters. Please check your key format."
 
+    # A key that passed recently is trusted without another Gemini round trip
+    fingerprint = api_key_fingerprint(api_key)
+    with validated_keys_lock:
+        validated_at = validated_keys.get(fingerprint)
+    if validated_at is not None and time.monotonic() - validated_at < KEY_VALIDATION_TTL:
+        return True, "✅ API key is valid and working!"
+
     try:
         # Test the API key with a simple request
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-2.0-flash')
+        model = get_gemini_model(api_key)
 
-        # Try a minimal test generation with timeout
-        response = model.generate_content("Test", generation_config={"max_output_tokens": 10})
+        # Counting tokens authenticates the key through the model's own client without generating
+        # anything, so validation costs no output tokens
+        model.count_tokens("Test")
+        remember_valid_key(fingerprint)
         return True, "✅ API key is valid and working!"
 
     except Exception as e:
         error_msg = str(e).lower()
-        print(f"API Key validation error: {e}")  # Debug info
+        logger.error(f"API Key validation error: {e}")  # Debug info
+        forget_gemini_model(api_key)
 
         if "api key not valid" in error_msg or "api_key_invalid" in error_msg:
             return False, """❌ Invalid API key. Please check your Gemini API key and try again.
@@ -384,271 +689,444 @@ def validate_api_key(api_key: str) -> tuple[bool, str]:
 • Try creating a new API key if the current one doesn't work
 • Check the Google Cloud Console for any billing or permission issues"""
 
+# Query modifiers used by the time-based and academic search strategies
+TIME_SENSITIVE_TOPICS = frozenset({'current_affairs', 'politics', 'technology', 'news'})
+TIME_MODIFIERS = ('2024', '2025', 'latest', 'recent', 'current', 'today', 'this year')
+ACADEMIC_MODIFIERS = ('analysis', 'research', 'study', 'report', 'comprehensive', 'detailed')
+
+# Normalize a URL so the same page found by different search strategies is only kept once
+def normalize_url(url: str) -> str:
+    """Lowercase scheme and host, drop utm_* tracking parameters, fragment and trailing slash"""
+    parts = urlsplit(url)
+    query = urlencode([
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith('utm_')
+    ])
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path.rstrip('/'), query, ''))
+
+# Run a single DuckDuckGo query; each call gets its own client so queries can run on separate threads
+def run_search_query(search_query: str, max_results: int, ttl: int = SEARCH_CACHE_TTL) -> List[Dict[str, str]]:
+    """Run one DuckDuckGo text search and return its results, served from the cache when possible"""
+    cache_key = ('search', search_query, max_results)
+    cached_results = research_cache.get(cache_key)
+    if cached_results is not None:
+        return cached_results
+
+    with DDGS() as ddgs:
+        results = list(ddgs.text(search_query, max_results=max_results))
+    if results:
+        research_cache.set(cache_key, results, expire=ttl)
+    return results
+
 # Search the web for relevant information using DuckDuckGo with enhanced targeting for diverse topics
 def web_search(query: str, max_results: int = 15) -> List[Dict[str, str]]:
     """Enhanced search for diverse topics: Politics, History, Technology, Current Affairs, etc."""
     try:
-        with DDGS() as ddgs:
-            all_results = []
-            
-            # Detect topic category for specialized search
-            topic_type = detect_topic_category(query.lower())
-            print(f"Detected topic category: {topic_type}")
-            
-            # Strategy 1: Exact phrase search
-            try:
-                exact_results = list(ddgs.text(f'"{query}"', max_results=max_results//3))
-                all_results.extend(exact_results)
-                print(f"Found {len(exact_results)} results from exact search")
-            except Exception as e:
-                print(f"Exact search error: {e}")
-            
-            # Strategy 2: Topic-specific domain searches
-            specialized_domains = get_specialized_domains(topic_type)
-            for domain in specialized_domains:
-                try:
-                    domain_results = list(ddgs.text(f'{query} site:{domain}', max_results=2))
-                    all_results.extend(domain_results)
-                    if len(all_results) >= max_results:
-                        break
-                except Exception as e:
-                    print(f"Domain search error for {domain}: {e}")
-                    continue
-            
-            # Strategy 3: Enhanced keyword searches based on topic
-            enhanced_keywords = get_topic_keywords(query, topic_type)
-            for keyword in enhanced_keywords[:5]:
-                try:
-                    keyword_results = list(ddgs.text(f'{query} {keyword}', max_results=2))
-                    all_results.extend(keyword_results)
-                    if len(all_results) >= max_results:
-                        break
-                except Exception as e:
-                    print(f"Keyword search error for {keyword}: {e}")
-                    continue
-            
-            # Strategy 4: Time-based searches for current affairs
-            if topic_type in ['current_affairs', 'politics', 'technology', 'news']:
-                time_modifiers = ['2024', '2025', 'latest', 'recent', 'current', 'today', 'this year']
-                for modifier in time_modifiers[:3]:
-                    try:
-                        time_results = list(ddgs.text(f'{query} {modifier}', max_results=2))
-                        all_results.extend(time_results)
-                        if len(all_results) >= max_results:
-                            break
-                    except Exception as e:
-                        print(f"Time-based search error for {modifier}: {e}")
-                        continue
-            
-            # Strategy 5: Academic and authoritative sources
-            academic_modifiers = ['analysis', 'research', 'study', 'report', 'comprehensive', 'detailed']
-            for modifier in academic_modifiers[:3]:
+        all_results = []
+        
+        # Detect topic category for specialized search
+        topic_type = detect_topic_category(query)
+        logger.info(f"Detected topic category: {topic_type}")
+        
+        # Plan every strategy's queries up front as {query: (max_results, error label)}.
+        # Strategies overlap (e.g. 'analysis' is both a topic keyword and an academic
+        # modifier), so only the first plan for each query string is kept.
+        # Strategy 1: Exact phrase search
+        planned_queries = {f'"{query}"': (max_results//3, "Exact search")}
+        
+        # Strategy 2: Topic-specific domain searches
+        specialized_domains = get_specialized_domains(topic_type)
+        for domain in specialized_domains:
+            planned_queries.setdefault(f'{query} site:{domain}', (2, f"Domain search for {domain}"))
+        
+        # Strategy 3: Enhanced keyword searches based on topic
+        enhanced_keywords = get_topic_keywords(query, topic_type)
+        for keyword in enhanced_keywords[:5]:
+            planned_queries.setdefault(f'{query} {keyword}', (2, f"Keyword search for {keyword}"))
+        
+        # Strategy 4: Time-based searches for current affairs
+        if topic_type in TIME_SENSITIVE_TOPICS:
+            for modifier in TIME_MODIFIERS[:3]:
+                planned_queries.setdefault(f'{query} {modifier}', (2, f"Time-based search for {modifier}"))
+        
+        # Strategy 5: Academic and authoritative sources
+        for modifier in ACADEMIC_MODIFIERS[:3]:
+            planned_queries.setdefault(f'{query} {modifier}', (2, f"Academic search for {modifier}"))
+        
+        # News goes stale quickly, so cache current-affairs searches for less time
+        cache_ttl = search_cache_ttl_for_topic(topic_type)
+        
+        # DDGS is a blocking client, so fan the queries out over a thread pool
+        executor = ThreadPoolExecutor(max_workers=SEARCH_WORKERS)
+        try:
+            futures = {
+                executor.submit(run_search_query, search_query, limit, cache_ttl): label
+                for search_query, (limit, label) in planned_queries.items()
+            }
+            for future in as_completed(futures):
                 try:
-                    academic_results = list(ddgs.text(f'{query} {modifier}', max_results=2))
-                    all_results.extend(academic_results)
-                    if len(all_results) >= max_results:
-                        break
+                    all_results.extend(future.result())
                 except Exception as e:
-                    print(f"Academic search error for {modifier}: {e}")
+                    logger.error(f"{futures[future]} error: {e}")
                     continue
-            
-            # Strategy 6: Fallback comprehensive search
-            if len(all_results) < 8:
-                try:
-                    general_results = list(ddgs.text(query, max_results=max_results//2))
-                    all_results.extend(general_results)
-                except Exception as e:
-                    print(f"General search error: {e}")
-            
-            # Remove duplicates and prioritize authoritative domains
-            seen_urls = set()
-            unique_results = []
-            priority_domains = get_priority_domains_for_topic(topic_type)
-            
-            # First, add results from priority domains
-            for result in all_results:
-                url = result.get('href', '')
-                if url not in seen_urls and any(domain in url for domain in priority_domains):
-                    seen_urls.add(url)
-                    unique_results.append(result)
-                    if len(unique_results) >= max_results:
-                        break
-            
-            # Then add other unique results
-            for result in all_results:
-                url = result.get('href', '')
-                if url not in seen_urls:
-                    seen_urls.add(url)
-                    unique_results.append(result)
-                    if len(unique_results) >= max_results:
-                        break
-            
-            print(f"Total unique results found: {len(unique_results)}")
-            return unique_results[:max_results]
+                if len(all_results) >= max_results:
+                    break
+        finally:
+            # Don't wait for queries still in flight once we have enough results
+            executor.shutdown(wait=False, cancel_futures=True)
+        logger.info(f"Found {len(all_results)} results from {len(planned_queries)} strategy searches")
+        
+        # Strategy 6: Fallback comprehensive search
+        if len(all_results) < 8:
+            try:
+                general_results = run_search_query(query, max_results//2, cache_ttl)
+                all_results.extend(general_results)
+            except Exception as e:
+                logger.error(f"General search error: {e}")
+        
+        # Remove duplicates and prioritize authoritative domains
+        seen_urls = set()
+        unique_results = []
+        priority_domains = get_priority_domains_for_topic(topic_type)
+        
+        # First, add results from priority domains
+        for result in all_results:
+            url = result.get('href', '')
+            normalized_url = normalize_url(url)
+            if normalized_url not in seen_urls and any(domain in url for domain in priority_domains):
+                seen_urls.add(normalized_url)
+                unique_results.append(result)
+                if len(unique_results) >= max_results:
+                    break
+        
+        # Then add other unique results
+        for result in all_results:
+            normalized_url = normalize_url(result.get('href', ''))
+            if normalized_url not in seen_urls:
+                seen_urls.add(normalized_url)
+                unique_results.append(result)
+                if len(unique_results) >= max_results:
+                    break
+        
+        logger.info(f"Total unique results found: {len(unique_results)}")
+        return unique_results[:max_results]
             
     except Exception as e:
-        print(f"Search error: {e}")
+        logger.error(f"Search error: {e}")
         # Final fallback - simple search
         try:
-            with DDGS() as ddgs:
-                results = list(ddgs.text(query, max_results=min(max_results, 5)))
-                print(f"Fallback search found: {len(results)} results")
-                return results
+            results = run_search_query(query, min(max_results, 5), search_cache_ttl_for_topic(detect_topic_category(query)))
+            logger.info(f"Fallback search found: {len(results)} results")
+            return results
         except Exception as e2:
-            print(f"Fallback search error: {e2}")
+            logger.error(f"Fallback search error: {e2}")
             return []
 
-# Fetch and extract content from a URL with better error handling
-def fetch_url_content(url: str) -> str:
-    """Fetch content from a URL and extract meaningful text with enhanced error handling"""
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-        }
-        
-        # Increase timeout and add retries
-        response = requests.get(url, headers=headers, timeout=15, allow_redirects=True)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
+# Extract the readable text of an HTML page, preferring its main content area
+def extract_page_text(html: bytes) -> str:
+    """Extract page text with selectolax when available, falling back to BeautifulSoup"""
+    if HTMLParser is not None:
+        tree = HTMLParser(html)
         
         # Remove unwanted elements
-        for element in soup(['script', 'style', 'nav', 'footer', 'header', 'aside', 'iframe', 'noscript']):
-            element.decompose()
+        for node in tree.css(','.join(UNWANTED_TAGS)):
+            node.decompose()
         
         # Try to get the main content area first
-        main_content = soup.find('main') or soup.find('article') or soup.find('div', class_=['content', 'main', 'body'])
-        if main_content:
-            text = main_content.get_text()
-        else:
-            text = soup.get_text()
-        
-        # Clean up text more thoroughly
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = ' '.join(chunk for chunk in chunks if chunk and len(chunk) > 2)
-        
-        # Remove excessive whitespace and clean up
-        text = re.sub(r'\s+', ' ', text)
-        text = text.strip()
-        
-        # Return more content for better analysis - increased from 5000 to 8000
-        return text[:8000] if text else ""
-        
-    except requests.exceptions.Timeout:
-        print(f"Timeout error for {url} - trying with shorter timeout")
+        main_content = tree.css_first('main') or tree.css_first('article') or tree.css_first('div.content, div.main, div.body')
+        root = main_content or tree.body or tree.root
+        return root.text(separator=' ') if root else ""
+    
+    soup = BeautifulSoup(html, BS4_PARSER)
+    
+    # Remove unwanted elements
+    for element in soup(list(UNWANTED_TAGS)):
+        element.decompose()
+    
+    # Try to get the main content area first
+    main_content = soup.find('main') or soup.find('article') or soup.find('div', class_=['content', 'main', 'body'])
+    if main_content:
+        return main_content.get_text()
+    return soup.get_text()
+
+# Turn a downloaded page into the source text kept for research (CPU-bound, so run off the fetch loop)
+def extract_source_text(html: bytes) -> str:
+    """Extract a page's text, collapse its whitespace and cut it to MAX_SOURCE_CHARS"""
+    text = extract_page_text(html)
+    
+    # Collapse all whitespace runs (newlines, indentation, tabs) in a single pass
+    text = WHITESPACE_RE.sub(' ', text).strip()
+    
+    # Return more content for better analysis - increased from 5000 to 8000
+    return text[:MAX_SOURCE_CHARS]
+
+# Per-host politeness limits: how many pages may be in flight from the host, and when it may next be asked
+@dataclass
+class HostState:
+    semaphore: asyncio.Semaphore
+    next_request_at: float = 0.0
+
+# host -> HostState, only ever touched on fetch_loop, so no lock. Each use restarts the entry's TTL,
+# so only hosts left idle for HOST_STATE_TTL are dropped.
+host_states = TTLCache(maxsize=HOST_STATE_CACHE_SIZE, ttl=HOST_STATE_TTL)
+
+# Politeness limits apply per site, so www.example.com and example.com share one key
+def host_key(url: str) -> str:
+    """Get the hostname a URL's request limits are tracked under"""
+    return (urlsplit(url).hostname or '').removeprefix('www.')
+
+# Get the fetch limits of the URL's host
+def get_host_state(url: str) -> HostState:
+    """Return the host's fetch state, creating it on first use"""
+    host = host_key(url)
+    state = host_states.get(host)
+    if state is None:
+        state = HostState(asyncio.Semaphore(HOST_CONCURRENCY))
+    host_states[host] = state
+    return state
+
+# Politeness: space out requests to the same host without delaying requests to other hosts
+async def wait_for_host_slot(state: HostState) -> None:
+    """Wait until the host may be requested again"""
+    now = time.monotonic()
+    slot = max(now, state.next_request_at)
+    state.next_request_at = slot + HOST_REQUEST_INTERVAL
+    if slot > now:
+        await asyncio.sleep(slot - now)
+
+# Download a page, retrying transient gateway errors and dropped connections with backoff
+async def read_url_with_retries(session: aiohttp.ClientSession, url: str) -> bytes:
+    """Download the raw body of a URL, retrying transient failures"""
+    for attempt in range(FETCH_RETRIES + 1):
+        is_last_attempt = attempt == FETCH_RETRIES
         try:
-            # Retry with shorter timeout
-            response = requests.get(url, headers=headers, timeout=8, allow_redirects=True)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
-            text = soup.get_text()
-            text = re.sub(r'\s+', ' ', text.strip())
-            return text[:5000] if text else ""
-        except Exception as retry_error:
-            print(f"Retry failed for {url}: {retry_error}")
-            return ""
-            
-    except requests.exceptions.RequestException as e:
-        print(f"Request error fetching {url}: {e}")
+            async with session.get(url, allow_redirects=True) as response:
+                if response.status in RETRY_STATUSES and not is_last_attempt:
+                    logger.warning(f"Got {response.status} from {url}, retrying")
+                else:
+                    response.raise_for_status()
+                    
+                    # Check the headers before downloading: skip PDFs, media and oversized pages
+                    content_type = response.headers.get('Content-Type', '').lower()
+                    if content_type and 'html' not in content_type:
+                        logger.warning(f"Skipping {url} - not an HTML page ({content_type})")
+                        return b""
+                    if response.content_length and response.content_length > MAX_PAGE_DOWNLOAD_BYTES:
+                        logger.warning(f"Skipping {url} - page too large ({response.content_length} bytes)")
+                        return b""
+                    
+                    # Only the first MAX_PAGE_READ_BYTES are needed for the extracted text
+                    body = bytearray()
+                    while len(body) < MAX_PAGE_READ_BYTES:
+                        chunk = await response.content.read(MAX_PAGE_READ_BYTES - len(body))
+                        if not chunk:
+                            break
+                        body.extend(chunk)
+                    return bytes(body)
+        except aiohttp.ClientConnectionError:
+            if is_last_attempt:
+                raise
+        await asyncio.sleep(RETRY_BACKOFF * 2 ** attempt)
+
+# Fetch and extract content from a URL with better error handling
+async def fetch_url_content(session: aiohttp.ClientSession, url: str, fetch_slots: asyncio.Semaphore) -> str:
+    """Fetch content from a URL and extract meaningful text with enhanced error handling"""
+    with page_memory_cache_lock:
+        cached_text = page_memory_cache.get(url)
+    if cached_text is not None:
+        return cached_text
+    
+    # Parsing and the SQLite-backed disk cache run in worker threads: every research run shares
+    # fetch_loop, and blocking it would stall socket reads for all of them
+    cached_text = await asyncio.to_thread(research_cache.get, ('page', url))
+    if cached_text is not None:
+        with page_memory_cache_lock:
+            page_memory_cache[url] = cached_text
+        return cached_text
+
+    try:
+        host_state = get_host_state(url)
+        async with host_state.semaphore:
+            await wait_for_host_slot(host_state)
+            # A shared download slot is taken only once the host allows the request, so fetches queued
+            # on one busy host never hold slots that other hosts' fetches could use
+            async with fetch_slots:
+                logger.info(f"🌐 Fetching content from {url}")
+                html = await read_url_with_retries(session, url)
+        text = await asyncio.to_thread(extract_source_text, html)
+        if text:
+            await asyncio.to_thread(research_cache.set, ('page', url), text, expire=cache_ttl_for_url(url))
+            with page_memory_cache_lock:
+                page_memory_cache[url] = text
+        return text
+        
+    except asyncio.TimeoutError:
+        logger.error(f"Timeout error for {url}")
+        return ""
+    except aiohttp.ClientError as e:
+        logger.error(f"Request error fetching {url}: {e}")
         return ""
     except Exception as e:
-        print(f"Unexpected error fetching {url}: {e}")
+        logger.error(f"Unexpected error fetching {url}: {e}")
         return ""
 
+# Persistent HTTP client: one background event loop owns a single pooled aiohttp session for the
+# whole process, so keep-alive connections and cached DNS survive across research runs
+fetch_loop = asyncio.new_event_loop()
+threading.Thread(target=fetch_loop.run_forever, name='fetch-loop', daemon=True).start()
+fetch_session: Optional[aiohttp.ClientSession] = None
+
+# Get the shared fetch session, creating it on first use (only ever called on fetch_loop)
+def get_fetch_session() -> aiohttp.ClientSession:
+    """Return the process-wide aiohttp session used for page fetches"""
+    global fetch_session
+    if fetch_session is None or fetch_session.closed:
+        # gzip/deflate bodies (see Accept-Encoding) are decompressed transparently
+        connector = aiohttp.TCPConnector(limit=FETCH_POOL_SIZE, limit_per_host=HOST_CONCURRENCY, ttl_dns_cache=DNS_CACHE_TTL)
+        fetch_session = aiohttp.ClientSession(headers=REQUEST_HEADERS, connector=connector, timeout=FETCH_TIMEOUT)
+    return fetch_session
+
+# Run a fetch coroutine on the shared loop and wait for its result from the calling thread
+def run_on_fetch_loop(coro):
+    """Submit a coroutine to fetch_loop and block until it finishes"""
+    return asyncio.run_coroutine_threadsafe(coro, fetch_loop).result()
+
+# Close the shared session and stop its loop when the process exits
+def close_fetch_session():
+    """Close the pooled fetch session and stop the background fetch loop"""
+    async def close():
+        if fetch_session is not None and not fetch_session.closed:
+            await fetch_session.close()
+    try:
+        asyncio.run_coroutine_threadsafe(close(), fetch_loop).result(timeout=5)
+    except Exception as e:
+        logger.error(f"Error closing fetch session: {e}")
+    fetch_loop.call_soon_threadsafe(fetch_loop.stop)
+
+atexit.register(close_fetch_session)
+
+# Fetch candidate sources concurrently on the shared session
+async def fetch_sources(candidates: List[Dict[str, str]], limit: int, accept) -> Tuple[List[Tuple[Dict[str, str], str]], int]:
+    """Fetch candidate sources concurrently, keeping the first `limit` whose content passes `accept`"""
+    accepted = []
+    rejected = 0
+    if limit <= 0 or not candidates:
+        return accepted, rejected
+    
+    # fetch_slots bounds how many page downloads are in flight, replacing the old per-fetch sleep
+    fetch_slots = asyncio.Semaphore(FETCH_CONCURRENCY)
+    session = get_fetch_session()
+    
+    async def bounded_fetch(candidate: Dict[str, str]) -> Tuple[Dict[str, str], str]:
+        return candidate, await fetch_url_content(session, candidate['url'], fetch_slots)
+    
+    tasks = [asyncio.create_task(bounded_fetch(candidate)) for candidate in candidates]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            candidate, content = await next_done
+            if accept(candidate, content):
+                accepted.append((candidate, content))
+                if len(accepted) >= limit:
+                    break
+            else:
+                rejected += 1
+    finally:
+        # Enough sources collected (or an error occurred): drop the remaining fetches
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    
+    return accepted, rejected
+
+# Separator line between source blocks in the research context
+SOURCE_SEPARATOR = '=' * 100
+
 # Research function using web search and content extraction with enhanced analysis for diverse topics
 def perform_research(query: str, max_sources: int = 12) -> Dict[str, Any]:
     """Perform comprehensive research by searching and extracting content from multiple sources"""
-    print(f"🔍 Starting comprehensive research for: {query}")
+    logger.info(f"🔍 Starting comprehensive research for: {query}")
     
     # Detect topic category for better research strategy
-    topic_type = detect_topic_category(query.lower())
-    print(f"📊 Detected topic category: {topic_type}")
+    topic_type = detect_topic_category(query)
+    logger.info(f"📊 Detected topic category: {topic_type}")
     
     # Search for relevant sources with more results to ensure we get at least 10 quality sources
     search_results = web_search(query, max_results=max_sources*4)  # Get more results initially
-    print(f"📊 Found {len(search_results)} potential sources")
+    logger.info(f"📊 Found {len(search_results)} potential sources")
     
-    sources = []
-    content_chunks = []
+    sources: List[Source] = []
+    # Source blocks are written straight into one buffer instead of being collected and joined
+    research_buffer = io.StringIO()
     successful_fetches = 0
-    failed_fetches = 0
     
-    for i, result in enumerate(search_results):
-        if successful_fetches >= max_sources:
-            break
-            
+    def write_source_block(header: str, candidate: Dict[str, str], content: str):
+        # Each page is already cut to MAX_SOURCE_CHARS, which bounds the whole context at max_sources pages
+        research_buffer.write(f"{header}:\nTITLE: {candidate['title']}\nURL: {candidate['url']}\nCONTENT:\n{content}\n{SOURCE_SEPARATOR}\n\n")
+    
+    # Skip low-quality or duplicate sources before anything is fetched
+    candidates = []
+    seen_urls: Set[str] = set()
+    for result in search_results:
         url = result.get('href', '')
         title = result.get('title', 'No title')
-        
-        # Skip low-quality or duplicate sources
-        if should_skip_source(url, title, sources):
-            print(f"⏭️ Skipping {url} - low quality or duplicate")
+        if should_skip_source(url, title, seen_urls):
+            logger.info(f"⏭️ Skipping {url} - low quality or duplicate")
             continue
-        
-        print(f"🌐 Fetching content from {url}")
-        content = fetch_url_content(url)
-        
+        candidates.append({'title': title, 'url': url})
+        seen_urls.add(url)
+    
+    # Everything the per-page relevance check needs is loop-invariant, so resolve it once here
+    query_words, query_matcher = compile_query_words(query)
+    topic_matcher = TOPIC_KEYWORD_MATCHERS.get(topic_type, TOPIC_KEYWORD_MATCHERS['general'])
+    topic_label = topic_type.upper()
+    
+    def is_usable(candidate: Dict[str, str], content: str) -> bool:
         if content and len(content) > 150:  # Minimum content threshold
             # Validate content quality for the specific topic
-            if is_relevant_content(content, query, topic_type):
-                sources.append({
-                    'title': title,
-                    'url': url,
-                    'content': content,
-                    'topic_type': topic_type
-                })
-                content_chunks.append(f"SOURCE {successful_fetches + 1} [{topic_type.upper()}]:\nTITLE: {title}\nURL: {url}\nCONTENT:\n{content}\n{'='*100}\n")
-                successful_fetches += 1
-                print(f"✅ Successfully extracted {len(content)} characters from source {successful_fetches}")
-            else:
-                print(f"⚠️ Content not relevant for {query}")
-                failed_fetches += 1
+            if is_relevant_content(content, query_words, query_matcher, topic_matcher):
+                return True
+            logger.warning(f"⚠️ Content not relevant for {query}")
         else:
-            print(f"⚠️ Skipped {url} - insufficient content ({len(content) if content else 0} chars)")
-            failed_fetches += 1
-        
-        # Add small delay to be respectful
-        time.sleep(0.3)
+            logger.warning(f"⚠️ Skipped {candidate['url']} - insufficient content ({len(content) if content else 0} chars)")
+        return False
+    
+    fetched, failed_fetches = run_on_fetch_loop(fetch_sources(candidates, max_sources, is_usable))
+    for candidate, content in fetched:
+        sources.append(Source(candidate['title'], candidate['url'], content, topic_type))
+        write_source_block(f"SOURCE {successful_fetches + 1} [{topic_label}]", candidate, content)
+        successful_fetches += 1
+        logger.info(f"✅ Successfully extracted {len(content)} characters from source {successful_fetches}")
     
     # If we don't have enough sources, try a broader search
     if successful_fetches < 8:
-        print(f"🔄 Only found {successful_fetches} quality sources, trying broader search...")
+        logger.info(f"🔄 Only found {successful_fetches} quality sources, trying broader search...")
         broader_results = web_search(f"{query} comprehensive analysis", max_results=15)
         
+        broader_candidates = []
+        seen_urls = {source.url for source in sources}
         for result in broader_results:
-            if successful_fetches >= max_sources:
-                break
-                
             url = result.get('href', '')
             title = result.get('title', 'No title')
-            
-            if should_skip_source(url, title, sources):
+            if should_skip_source(url, title, seen_urls):
                 continue
-                
-            content = fetch_url_content(url)
-            if content and len(content) > 100:
-                sources.append({
-                    'title': title,
-                    'url': url,
-                    'content': content,
-                    'topic_type': 'additional'
-                })
-                content_chunks.append(f"ADDITIONAL SOURCE {successful_fetches + 1}:\nTITLE: {title}\nURL: {url}\nCONTENT:\n{content}\n{'='*100}\n")
-                successful_fetches += 1
-                print(f"✅ Additional source {successful_fetches} added")
-            
-            time.sleep(0.3)
+            broader_candidates.append({'title': title, 'url': url})
+            seen_urls.add(url)
+        
+        fetched, _ = run_on_fetch_loop(fetch_sources(
+            broader_candidates,
+            max_sources - successful_fetches,
+            lambda candidate, content: bool(content) and len(content) > 100
+        ))
+        for candidate, content in fetched:
+            sources.append(Source(candidate['title'], candidate['url'], content, 'additional'))
+            write_source_block(f"ADDITIONAL SOURCE {successful_fetches + 1}", candidate, content)
+            successful_fetches += 1
+            logger.info(f"✅ Additional source {successful_fetches} added")
     
-    research_context = "\n".join(content_chunks)
+    research_context = research_buffer.getvalue()
     
-    print(f"📝 Research completed: {successful_fetches} sources processed, {failed_fetches} failed")
-    print(f"📊 Total content length: {len(research_context)} characters")
+    logger.info(f"📝 Research completed: {successful_fetches} sources processed, {failed_fetches} failed")
+    logger.info(f"📊 Total content length: {len(research_context)} characters")
     
     return {
         'sources': sources,
@@ -659,596 +1137,607 @@ def perform_research(query: str, max_sources: int = 12) -> Dict[str, Any]:
         'failed_sources': failed_fetches
     }
 
-def should_skip_source(url: str, title: str, existing_sources: List[Dict]) -> bool:
+def should_skip_source(url: str, title: str, seen_urls: Set[str]) -> bool:
     """Check if a source should be skipped based on quality and duplication"""
     # Skip if URL already exists
-    existing_urls = [source['url'] for source in existing_sources]
-    if url in existing_urls:
+    if url in seen_urls:
         return True
     
-    # Skip low-quality domains
-    low_quality_domains = ['pinterest.com', 'instagram.com', 'facebook.com', 'twitter.com', 'tiktok.com', 'reddit.com']
-    if any(domain in url for domain in low_quality_domains):
+    # Skip low-quality domains, matched on the parsed hostname rather than anywhere in the URL
+    if host_in_domains(urlsplit(url).hostname or '', LOW_QUALITY_DOMAINS):
         return True
     
     # Skip if title is too short or generic
-    if len(title) < 10 or title.lower() in ['no title', 'untitled', 'page not found']:
+    if len(title) < 10 or title.lower() in GENERIC_TITLES:
         return True
     
     return False
 
-def is_relevant_content(content: str, query: str, topic_type: str) -> bool:
-    """Check if content is relevant to the query and topic type"""
-    content_lower = content.lower()
-    query_words = query.lower().split()
+def is_relevant_content(content: str, query_words: Tuple[str, ...], query_matcher: Optional[TermMatcher], topic_matcher: TermMatcher) -> bool:
+    """Check if content is relevant to the query (see compile_query_words) and its topic's keywords"""
+    # Content should have reasonable length before it is worth scanning
+    if len(content) <= 200:
+        return False
     
-    # Check if at least 30% of query words appear in content
-    matching_words = sum(1 for word in query_words if word in content_lower)
-    word_relevance = matching_words / len(query_words) if query_words else 0
+    # Check if at least 30% of query words appear in content; a repeated word counts every time it
+    # appears in the query ("New York New Jersey" is four words)
+    word_relevance = 0
+    if query_matcher is not None:
+        found_words = find_terms(query_matcher, content, len(query_matcher[1]))
+        matching_words = sum(1 for word in query_words if word in found_words)
+        word_relevance = matching_words / len(query_words)
     
-    # Topic-specific relevance keywords
-    topic_relevance_keywords = get_topic_keywords(query, topic_type)
-    topic_matches = sum(1 for keyword in topic_relevance_keywords if keyword.lower() in content_lower)
+    # Topic-specific relevance keywords, only scanned when the query words alone aren't enough
+    topic_matches = 0
+    if word_relevance < 0.3:
+        topic_matches = len(find_terms(topic_matcher, content, 2))
     
-    # Content should have reasonable length and relevance
-    return len(content) > 200 and (word_relevance >= 0.3 or topic_matches >= 2)
+    return word_relevance >= 0.3 or topic_matches >= 2
+
+# Compile a query's words once per research run so each page is scanned in a single regex pass
+def compile_query_words(query: str) -> Tuple[Tuple[str, ...], Optional[TermMatcher]]:
+    """Return the query's lowercase words (repeats included) and a matcher for them, None for an empty query"""
+    words = tuple(query.lower().split())
+    return words, compile_term_matcher(words) if words else None
+
+# Find the distinct terms that occur in content (as substrings, case-insensitively),
+# stopping the scan once `enough` have been seen
+def find_terms(matcher: TermMatcher, content: str, enough: int) -> Set[str]:
+    """Scan content once with a term matcher and return the terms it contains"""
+    pattern, terms = matcher
+    found = set()
+    for match in pattern.finditer(content):
+        found.add(match.group(1).lower())
+        if len(found) >= enough:
+            break
+    # At each position only the longest term is captured; any term inside a found term occurs too
+    return {term for term in terms if term in found or any(term in longer for longer in found)}
+
+# Fixed report-writing instructions, filled in per query with str.format and joined after the research context
+REPORT_PROMPT_INSTRUCTIONS = """
+
+INSTRUCTIONS FOR {topic_label} RESEARCH REPORT:
+Based on the above research data, create a comprehensive, well-structured report analyzing ALL the information provided. This is a {topic_type} research topic, so focus on relevant aspects for this domain.
+
+Your report structure should include:
+
+1. **EXECUTIVE SUMMARY** 
+   - Key findings and main points about {query}
+   - Critical insights and takeaways
+   - Brief overview of what the research reveals
+
+2. **DETAILED ANALYSIS** 
+   - In-depth examination of all collected information
+   - Multiple perspectives and viewpoints found in sources
+   - Connections between different pieces of information
+   - Contradictions or debates if any exist
+
+3. **BACKGROUND & CONTEXT**
+   - Historical background (if relevant)
+   - Current situation and status
+   - Relevant context that helps understand the topic
+
+4. **KEY FINDINGS & INSIGHTS**
+   - Most important discoveries from the research
+   - Patterns and trends identified
+   - Significant facts and statistics
+   - Expert opinions and analysis
+
+5. **CURRENT STATUS & DEVELOPMENTS** 
+   - Latest information and recent developments
+   - Current state of affairs
+   - Recent changes or updates
+
+6. **DIFFERENT PERSPECTIVES**
+   - Various viewpoints found in sources
+   - Debates and discussions around the topic
+   - Conflicting information (if any)
+
+7. **IMPLICATIONS & SIGNIFICANCE**
+   - Why this topic matters
+   - Impact and consequences
+   - Future implications
+
+8. **DETAILED BREAKDOWN**
+   - Specific details from each major source
+   - Technical information (if applicable)
+   - Statistics and data points
+   - Quotes and specific information
+
+9. **CONCLUSIONS**
+   - Summary of what was discovered
+   - Final thoughts and analysis
+   - Gaps in information (if any)
+
+10. **SOURCES & REFERENCES**
+    - List all sources with proper attribution
+    - Include URLs for verification
+    - Note the reliability and type of each source
+
+FORMATTING REQUIREMENTS:
+- Use clear Markdown formatting with headers (##), subheaders (###), and bullet points
+- Make the content engaging, informative, and well-organized
+- Include specific details, examples, and quotes from the sources
+- Highlight important information with **bold text**
+- Use bullet points for lists and key points
+- Organize information logically and coherently
+- If information is conflicting, present both sides
+- If insufficient information is available for any section, clearly state what could not be determined
+
+CONTENT REQUIREMENTS:
+- Base your analysis ONLY on the provided source content
+- Do not make assumptions or add information not present in the sources
+- Include specific details and examples from multiple sources
+- Synthesize information from all sources, don't just summarize each one separately
+- Maintain objectivity and present facts as found in sources
+- If sources contradict each other, present both perspectives
+- Focus on creating a comprehensive understanding of {query}
+
+TOPIC-SPECIFIC FOCUS FOR {topic_label}:
+"""
+REPORT_PROMPT_CLOSING = """
+
+Remember: This report should be thorough, well-researched, and provide real value to someone wanting to understand {query} comprehensively.
+"""
+
+# On Python 3.9 an asyncio.Semaphore binds to the loop current when it is created, and a module-level one
+# would bind to the import thread's loop; it is created on first use instead, on the loop serving reports
+def get_gemini_generation_semaphore() -> asyncio.Semaphore:
+    """Return the semaphore bounding concurrent report generations, creating it on the running loop"""
+    global gemini_generation_semaphore
+    if gemini_generation_semaphore is None:
+        gemini_generation_semaphore = asyncio.Semaphore(GEMINI_CONCURRENCY)
+    return gemini_generation_semaphore
+
+# Report generation failures are raised, not streamed, so they can never be mistaken for report text
+class ReportGenerationError(Exception):
+    """A report could not be generated; the message is shown to the user as-is"""
 
 # Generate a research report using Gemini with enhanced topic handling
-def generate_research_report(research_data: Dict[str, Any], gemini_api_key: str) -> str:
-    """Generate a comprehensive research report using Gemini for diverse topics"""
+async def generate_research_report(research_data: Dict[str, Any], gemini_api_key: str) -> AsyncIterator[str]:
+    """Stream a comprehensive research report from Gemini for diverse topics, one text chunk at a time"""
     if not gemini_api_key:
-        return "❌ Gemini API key is required to generate the report."
-    
-    # Validate API key first
-    is_valid, validation_message = validate_api_key(gemini_api_key)
-    if not is_valid:
-        return f"❌ {validation_message}"
+        raise ReportGenerationError("❌ Gemini API key is required to generate the report.")
     
     try:
-        # Initialize Gemini (already configured in validation)
-        model = genai.GenerativeModel('gemini-2.0-flash')
+        # Reuse the model created when run_research validated the key
+        model = get_gemini_model(gemini_api_key.strip())
+        bind_async_gemini_client(model, gemini_api_key.strip())
         
         topic_type = research_data.get('topic_type', 'general')
         failed_sources = research_data.get('failed_sources', 0)
         
-        # Create topic-specific prompt
-        prompt = f"""
-        RESEARCH QUERY: {research_data['query']}
-        TOPIC CATEGORY: {topic_type.upper()}
-        TOTAL SOURCES ANALYZED: {research_data.get('total_sources', len(research_data['sources']))}
-        FAILED SOURCES: {failed_sources}
-        
-        COMPREHENSIVE RESEARCH DATA FROM MULTIPLE AUTHORITATIVE SOURCES:
-        {research_data['research_context']}
-        
-        INSTRUCTIONS FOR {topic_type.upper()} RESEARCH REPORT:
-        Based on the above research data, create a comprehensive, well-structured report analyzing ALL the information provided. This is a {topic_type} research topic, so focus on relevant aspects for this domain.
-        
-        Your report structure should include:
-        
-        1. **EXECUTIVE SUMMARY** 
-           - Key findings and main points about {research_data['query']}
-           - Critical insights and takeaways
-           - Brief overview of what the research reveals
-        
-        2. **DETAILED ANALYSIS** 
-           - In-depth examination of all collected information
-           - Multiple perspectives and viewpoints found in sources
-           - Connections between different pieces of information
-           - Contradictions or debates if any exist
-        
-        3. **BACKGROUND & CONTEXT**
-           - Historical background (if relevant)
-           - Current situation and status
-           - Relevant context that helps understand the topic
-        
-        4. **KEY FINDINGS & INSIGHTS**
-           - Most important discoveries from the research
-           - Patterns and trends identified
-           - Significant facts and statistics
-           - Expert opinions and analysis
-        
-        5. **CURRENT STATUS & DEVELOPMENTS** 
-           - Latest information and recent developments
-           - Current state of affairs
-           - Recent changes or updates
-        
-        6. **DIFFERENT PERSPECTIVES**
-           - Various viewpoints found in sources
-           - Debates and discussions around the topic
-           - Conflicting information (if any)
-        
-        7. **IMPLICATIONS & SIGNIFICANCE**
-           - Why this topic matters
-           - Impact and consequences
-           - Future implications
-        
-        8. **DETAILED BREAKDOWN**
-           - Specific details from each major source
-           - Technical information (if applicable)
-           - Statistics and data points
-           - Quotes and specific information
-        
-        9. **CONCLUSIONS**
-           - Summary of what was discovered
-           - Final thoughts and analysis
-           - Gaps in information (if any)
-        
-        10. **SOURCES & REFERENCES**
-            - List all sources with proper attribution
-            - Include URLs for verification
-            - Note the reliability and type of each source
-        
-        FORMATTING REQUIREMENTS:
-        - Use clear Markdown formatting with headers (##), subheaders (###), and bullet points
-        - Make the content engaging, informative, and well-organized
-        - Include specific details, examples, and quotes from the sources
-        - Highlight important information with **bold text**
-        - Use bullet points for lists and key points
-        - Organize information logically and coherently
-        - If information is conflicting, present both sides
-        - If insufficient information is available for any section, clearly state what could not be determined
-        
-        CONTENT REQUIREMENTS:
-        - Base your analysis ONLY on the provided source content
-        - Do not make assumptions or add information not present in the sources
-        - Include specific details and examples from multiple sources
-        - Synthesize information from all sources, don't just summarize each one separately
-        - Maintain objectivity and present facts as found in sources
-        - If sources contradict each other, present both perspectives
-        - Focus on creating a comprehensive understanding of {research_data['query']}
-        
-        TOPIC-SPECIFIC FOCUS FOR {topic_type.upper()}:
-        {get_topic_specific_instructions(topic_type)}
-        
-        Remember: This report should be thorough, well-researched, and provide real value to someone wanting to understand {research_data['query']} comprehensively.
-        """
-        
-        response = model.generate_content(prompt)
-        return response.text
+        # Assemble the prompt from parts in one join, so the large research context is copied only once
+        topic_label = topic_type.upper()
+        query = research_data['query']
+        total_sources = research_data.get('total_sources', len(research_data['sources']))
+        prompt = ''.join((
+            f"RESEARCH QUERY: {query}\n"
+            f"TOPIC CATEGORY: {topic_label}\n"
+            f"TOTAL SOURCES ANALYZED: {total_sources}\n"
+            f"FAILED SOURCES: {failed_sources}\n\n"
+            "COMPREHENSIVE RESEARCH DATA FROM MULTIPLE AUTHORITATIVE SOURCES:\n",
+            research_data['research_context'],
+            REPORT_PROMPT_INSTRUCTIONS.format(query=query, topic_type=topic_type, topic_label=topic_label),
+            get_topic_specific_instructions(topic_type),
+            REPORT_PROMPT_CLOSING.format(query=query),
+        ))
+        
+        # Stream the report so the UI can render it while Gemini is still generating
+        async with get_gemini_generation_semaphore():
+            response = await model.generate_content_async(prompt, stream=True)
+            async for chunk in response:
+                # chunk.text raises for chunks without parts, such as a trailing STOP or MAX_TOKENS chunk
+                text = ''.join(part.text for part in chunk.parts)
+                if text:
+                    yield text
     except Exception as e:
-        error_msg = str(e).lower()
-        print(f"Report generation error: {e}")  # Debug info
+        logger.error(f"Report generation error: {e}")  # Debug info
+        raise ReportGenerationError(report_error_message(e)) from e
 
-        if "api key not valid" in error_msg or "api_key_invalid" in error_msg:
-            return """❌ Invalid API key during report generation.
+# Turn a report generation failure into a user-facing message
+def report_error_message(e: Exception) -> str:
+    """Map a Gemini error during report generation to troubleshooting advice"""
+    error_msg = str(e).lower()
+    
+    if "api key not valid" in error_msg or "api_key_invalid" in error_msg:
+        return """❌ Invalid API key during report generation.
 
 **Common issues:**
 • Your API key may have expired or been revoked
 • Check if you copied the complete key
 • Try regenerating your API key at https://aistudio.google.com/"""
 
-        elif "quota" in error_msg or "limit" in error_msg:
-            return """❌ API quota exceeded during report generation.
+    elif "quota" in error_msg or "limit" in error_msg:
+        return """❌ API quota exceeded during report generation.
 
 **Solutions:**
 • Check your usage at https://aistudio.google.com/
 • Wait for the quota to reset (usually monthly)
 • Consider upgrading your plan if needed"""
 
-        elif "permission" in error_msg or "forbidden" in error_msg:
-            return """❌ API key doesn't have required permissions for report generation.
+    elif "permission" in error_msg or "forbidden" in error_msg:
+        return """❌ API key doesn't have required permissions for report generation.
 
 **Solutions:**
 • Regenerate your API key at https://aistudio.google.com/
 • Make sure the API key is enabled for Gemini API"""
 
-        elif "network" in error_msg or "connection" in error_msg or "timeout" in error_msg:
-            return """❌ Network error during report generation.
+    elif "network" in error_msg or "connection" in error_msg or "timeout" in error_msg:
+        return """❌ Network error during report generation.
 
 **Troubleshooting:**
 • Check your internet connection
 • Try again in a few minutes
 • The report generation process may take some time"""
 
-        elif "model" in error_msg:
-            return """❌ Model not available for report generation.
+    elif "model" in error_msg:
+        return """❌ Model not available for report generation.
 
 **Solutions:**
 • Try using a different model
 • Check Gemini API availability at https://status.cloud.google.com/"""
 
-        else:
-            return f"""❌ Error generating report: {str(e)}
+    else:
+        return f"""❌ Error generating report: {str(e)}
 
 **Debugging tips:**
 • Try with a shorter research topic
 • Check your internet connection
 • Make sure your API key has sufficient quota"""
 
-def get_topic_specific_instructions(topic_type: str) -> str:
-    """Get specific instructions based on topic category"""
-    instructions = {
-        'politics': """
+# Topic-specific focus for the report prompt, built once and read-only
+TOPIC_INSTRUCTIONS = MappingProxyType({
+    'politics': """
         - Focus on political implications, policy details, and governmental aspects
         - Include information about key political figures, parties, and institutions
         - Analyze policy impacts and political consequences
         - Present multiple political perspectives objectively
         - Include information about voting patterns, polls, or public opinion if available
         """,
-        'history': """
+    'history': """
         - Provide chronological context and timeline of events
         - Include historical significance and long-term impacts
         - Mention key historical figures, dates, and places
         - Analyze causes and effects of historical events
         - Connect historical events to modern implications
         """,
-        'geography': """
+    'geography': """
         - Include specific geographical data, coordinates, and locations
         - Provide demographic, climate, and physical geography information
         - Discuss economic geography and natural resources
         - Include maps, borders, and territorial information
         - Analyze geographical impacts on society and economy
         """,
-        'current_affairs': """
+    'current_affairs': """
         - Focus on the most recent developments and breaking news
         - Include timeline of recent events
         - Analyze immediate impacts and short-term consequences
         - Provide context for why this is currently significant
         - Include quotes from recent statements or press releases
         """,
-        'technology': """
+    'technology': """
         - Focus on technical specifications, capabilities, and limitations
         - Include information about development timeline and key innovators
         - Analyze technological implications and future potential
         - Discuss adoption rates, market impact, and competitive landscape
         - Include technical details and how the technology works
         """,
-        'war': """
+    'war': """
         - Provide strategic analysis and military context
         - Include information about forces, tactics, and equipment involved
         - Analyze geopolitical implications and international responses
         - Discuss humanitarian impacts and civilian consequences
         - Present timeline of conflict development
         """,
-        'economics': """
+    'economics': """
         - Include specific economic data, statistics, and indicators
         - Analyze market trends, financial impacts, and economic consequences
         - Discuss effects on different sectors and stakeholders
         - Include information about economic policies and their outcomes
         - Provide context about economic significance and implications
         """,
-        'science': """
+    'science': """
         - Focus on scientific methodology, research findings, and evidence
         - Include information about research institutions and scientists involved
         - Explain scientific concepts and their implications
         - Discuss peer review status and scientific consensus
         - Analyze potential applications and future research directions
         """
-    }
-    return instructions.get(topic_type, "Focus on providing comprehensive, factual information with proper context and analysis.")
+})
+DEFAULT_TOPIC_INSTRUCTIONS = "Focus on providing comprehensive, factual information with proper context and analysis."
+
+def get_topic_specific_instructions(topic_type: str) -> str:
+    """Get specific instructions based on topic category"""
+    return TOPIC_INSTRUCTIONS.get(topic_type, DEFAULT_TOPIC_INSTRUCTIONS)
+
+# Report files are written off the request thread: the markdown file and the PDF render in parallel,
+# and the report is shown before the PDF is ready
+report_file_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='report-file')
+
+# Each run's report files go in a directory of their own under REPORT_ROOT. Gradio copies a file into
+# its own cache as soon as it is handed to a download button, so run directories older than
+# REPORT_DIR_TTL are no longer needed and are pruned whenever a new run starts
+REPORT_ROOT = os.path.join(tempfile.gettempdir(), 'deepresearch-reports')
+REPORT_DIR_TTL = 60 * 60
+
+def create_report_dir() -> str:
+    """Prune expired run directories and create a fresh one for this run"""
+    cutoff = time.time() - REPORT_DIR_TTL
+    os.makedirs(REPORT_ROOT, exist_ok=True)
+    for entry in os.scandir(REPORT_ROOT):
+        try:
+            if entry.is_dir() and entry.stat().st_mtime < cutoff:
+                shutil.rmtree(entry.path, ignore_errors=True)
+        except OSError:
+            continue
+    return tempfile.mkdtemp(prefix='research-', dir=REPORT_ROOT)
+
+# Research jobs the interface runs at the same time, and how many more may wait in the queue
+# before new clicks are turned away
+RESEARCH_CONCURRENCY = 16
+RESEARCH_QUEUE_SIZE = 64
+
+# Each research job holds a thread for the whole search and fetch, so jobs get a pool of their own with
+# one thread per concurrent job (the loop's default executor can be as small as five threads).
+# Key checks and query embeddings are short Gemini calls on a separate pool, so a new user's key check
+# never waits behind other users' research.
+research_executor = ThreadPoolExecutor(max_workers=RESEARCH_CONCURRENCY, thread_name_prefix='research')
+gemini_call_executor = ThreadPoolExecutor(max_workers=RESEARCH_CONCURRENCY, thread_name_prefix='gemini-call')
+
+# Fixed research handler outputs, built once: hiding a component is the same update every time.
+# Gradio edits update dicts in place while postprocessing (it pops 'value' and deletes None entries),
+# so a shared update must never carry a value or a None; per-run values go in a fresh gr.update()
+HIDDEN = gr.update(visible=False)
+NO_API_KEY_MESSAGE = "❌ Please enter your Gemini API key."
+NO_TOPIC_MESSAGE = "❌ Please enter a research topic."
+NO_SOURCES_MESSAGE = "❌ No relevant sources found. Please try a different search term."
+# While ReportLab renders, the PDF button is shown disabled so users know it is coming
+PDF_BUTTON_LABEL = "📄 Download PDF Report"
+PDF_RENDERING = gr.update(label="⏳ Preparing PDF Report...", interactive=False, visible=True)
+# Progress card shown above the report until the first streamed chunk arrives
+PROGRESS_HTML = """
+<div class="feature-card">
+    <h4>🔄 Research in Progress...</h4>
+    <p>📊 Analyzing: <strong>{topic}</strong></p>
+    <p>⏳ This may take 1-2 minutes. Please wait...</p>
+</div>
+"""
+UNCHANGED = gr.update()
 
 # Main research function
-def run_research(topic: str, gemini_api_key: str, download_format: str = "markdown"):
-    """Run the complete research process"""
+async def run_research(topic: str, gemini_api_key: str, download_format: str = "markdown"):
+    """Run the complete research process, streaming the report into the UI as it is generated"""
     if not gemini_api_key.strip():
-        return "❌ Please enter your Gemini API key.", None, None, gr.update(visible=False), gr.update(visible=False)
+        yield NO_API_KEY_MESSAGE, HIDDEN, HIDDEN, HIDDEN
+        return
     
     if not topic.strip():
-        return "❌ Please enter a research topic.", None, None, gr.update(visible=False), gr.update(visible=False)
+        yield NO_TOPIC_MESSAGE, HIDDEN, HIDDEN, HIDDEN
+        return
     
-    # First validate the API key
-    is_valid, validation_message = validate_api_key(gemini_api_key)
+    # Validate the API key before any searching starts: a research run cannot be cancelled once its
+    # thread is running. Both are blocking network work, so each runs in a worker thread and the event
+    # loop stays free for other users
+    loop = asyncio.get_running_loop()
+    progress_card = gr.update(value=PROGRESS_HTML.format(topic=html_escape(topic)), visible=True)
+    yield "🔐 Checking your Gemini API key...", HIDDEN, HIDDEN, progress_card
+    is_valid, validation_message = await loop.run_in_executor(gemini_call_executor, validate_api_key, gemini_api_key)
     if not is_valid:
-        return f"❌ {validation_message}", None, None, gr.update(visible=False), gr.update(visible=False)
+        yield f"❌ {validation_message}", HIDDEN, HIDDEN, HIDDEN
+        return
     
     try:
-        # Perform research
-        print(f"Starting research for: {topic}")
-        research_data = perform_research(topic)
-        
-        if not research_data['sources']:
-            return "❌ No relevant sources found. Please try a different search term.", None, None, gr.update(visible=False), gr.update(visible=False)
-        
-        print(f"Found {len(research_data['sources'])} sources, generating report...")
-        
-        # Generate report
-        report = generate_research_report(research_data, gemini_api_key)
+        # A near-identical query this key researched recently reuses that report and its sources,
+        # skipping the search, the page fetches and the generation. Keys with nothing cached skip the embedding.
+        api_key = gemini_api_key.strip()
+        fingerprint = api_key_fingerprint(api_key)
+        model = get_gemini_model(api_key)
+        query_vector = None
+        cached = None
+        if has_cached_reports(fingerprint):
+            try:
+                query_vector = await loop.run_in_executor(gemini_call_executor, embed_query, topic, model)
+                cached = find_cached_report(query_vector, fingerprint)
+            except Exception as e:
+                logger.warning(f"Semantic cache lookup skipped: {e}")
         
-        # Check if report generation was successful
-        if report.startswith("❌"):
-            return report, None, None, gr.update(visible=False), gr.update(visible=False)
+        if cached is not None:
+            logger.info("♻️ Reusing the report generated for a similar query")
+            report, sources = cached
+        else:
+            # Perform research
+            logger.info(f"Starting research for: {topic}")
+            yield f"🔍 Searching the web and reading sources for **{topic}**...", HIDDEN, HIDDEN, UNCHANGED
+            research_data = await loop.run_in_executor(research_executor, perform_research, topic)
+            sources = research_data['sources']
+            
+            if not sources:
+                yield NO_SOURCES_MESSAGE, HIDDEN, HIDDEN, HIDDEN
+                return
+            
+            logger.info(f"Found {len(sources)} sources, generating report...")
+            yield f"✍️ Writing the report from {len(sources)} sources...", HIDDEN, HIDDEN, UNCHANGED
+            
+            # Generate report, showing the partial markdown after every streamed chunk
+            report = ""
+            try:
+                async for chunk in generate_research_report(research_data, api_key):
+                    report += chunk
+                    yield report, HIDDEN, HIDDEN, HIDDEN
+            except ReportGenerationError as e:
+                yield str(e), HIDDEN, HIDDEN, HIDDEN
+                return
+            
+            # Cache the report in the background; embedding the query is a Gemini round trip
+            # the user should not wait on
+            def remember_report():
+                try:
+                    vector = query_vector if query_vector is not None else embed_query(topic, model)
+                    cache_report(vector, fingerprint, report, sources, research_data['topic_type'])
+                except Exception as e:
+                    logger.warning(f"Report not cached: {e}")
+            loop.run_in_executor(gemini_call_executor, remember_report)
         
         # Create safe downloadable filenames from the TOPIC, not the report content
         base_filename = sanitize_filename(topic)
         if not base_filename.endswith('.md'):
             base_filename = base_filename.replace('.md', '') + '_report.md'
         
+        # Each run writes into its own temporary directory, so users researching the same topic never
+        # share files; the readable filename is kept inside it
+        report_dir = await loop.run_in_executor(report_file_executor, create_report_dir)
+        
+        # Write the markdown file and generate the PDF (using the original topic for filename) in parallel;
+        # the markdown download is offered while ReportLab is still rendering
+        md_future = loop.run_in_executor(report_file_executor, write_markdown_report, report, report_dir, base_filename)
+        pdf_future = loop.run_in_executor(report_file_executor, create_pdf_report, report, topic, sources, report_dir, base_filename)
+        md_path = await md_future
+        yield report, gr.update(value=md_path, visible=md_path is not None), PDF_RENDERING, HIDDEN
+        
         pdf_path = None
         try:
-            # Generate PDF using the original topic for filename
-            pdf_path = create_pdf_report(report, topic, research_data['sources'], base_filename)
-            print(f"PDF generated successfully: {pdf_path}")
+            pdf_path = await pdf_future
+            logger.info(f"PDF generated successfully: {pdf_path}")
         except Exception as pdf_error:
-            print(f"PDF generation failed: {pdf_error}")
+            logger.error(f"PDF generation failed: {pdf_error}")
             # Continue without PDF if it fails
         
-        print(f"Research completed successfully. MD: {base_filename}")
+        logger.info(f"Research completed successfully. MD: {md_path}")
         
-        return report, base_filename, pdf_path, gr.update(visible=True), gr.update(visible=True)
+        pdf_button = gr.update(value=pdf_path, label=PDF_BUTTON_LABEL, interactive=True, visible=pdf_path is not None)
+        yield report, gr.update(value=md_path, visible=md_path is not None), pdf_button, HIDDEN
         
     except Exception as e:
-        print(f"Research error: {e}")  # Debug info
+        logger.error(f"Research error: {e}")  # Debug info
         error_msg = f"❌ An error occurred during research: {str(e)}"
-        return error_msg, None, None, gr.update(visible=False), gr.update(visible=False)
+        yield error_msg, HIDDEN, HIDDEN, HIDDEN
+
+# Dark theme CSS lives in static/dark.css and is read once per process
+DARK_CSS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'dark.css')
+
+@lru_cache(maxsize=1)
+def load_dark_css() -> str:
+    """Read the dark theme stylesheet"""
+    with open(DARK_CSS_PATH, encoding='utf-8') as css_file:
+        return css_file.read()
+
+# API key status card: one template, with (css class, heading, body) per validation state.
+# Only the escaped message is filled in per click.
+KEY_STATUS_HTML = '<div class="{css_class}"><h4>{heading}</h4>{body}</div>'
+KEY_STATUS_STATES = MappingProxyType({
+    'empty': ('status-error', '❌ API Key Required', '<p>Please enter your Gemini API key above.</p>'),
+    'valid': ('status-success', '✅ API Key Valid!', '<p>{message}</p><p>You\'re ready to start researching!</p>'),
+    'invalid': ('status-error', '❌ API Key Issue', '<div style="white-space: pre-line;">{message}</div>'),
+})
+
+# Dark theme for the interface, built once at import
+DARK_THEME = gr.themes.Base(
+    primary_hue="blue",
+    secondary_hue="gray",
+    neutral_hue="slate",
+    text_size="md",
+    radius_size="lg",
+    spacing_size="lg"
+).set(
+    body_background_fill="linear-gradient(135deg, #1a1a2e 0%, #16213e 50%, #0f3460 100%)",
+    block_background_fill="rgba(255, 255, 255, 0.05)",
+    block_border_color="rgba(255, 255, 255, 0.1)",
+    block_radius="15px",
+    button_primary_background_fill="linear-gradient(135deg, #64b5f6, #42a5f5)",
+    button_primary_text_color="white",
+    input_background_fill="rgba(255, 255, 255, 0.1)",
+    input_border_color="rgba(255, 255, 255, 0.3)",
+    body_text_color="white",
+    block_label_text_color="white"
+)
+
+# Static page sections, rendered once at import
+# Hero banner
+HERO_HTML = f"""
+<div class="hero-section">
+    <h1 style="font-size: 3rem; font-weight: bold; margin: 0; text-shadow: 2px 2px 4px rgba(0,0,0,0.3);">
+        🔬 {APP_NAME}
+    </h1>
+    <h2 style="font-size: 1.5rem; margin: 0.5rem 0; opacity: 0.9;">
+        {APP_DESCRIPTION}
+    </h2>
+    <p style="font-size: 1.1rem; margin: 1rem 0; opacity: 0.8;">
+        Powered by Google Gemini AI & Advanced Web Research
+    </p>
+</div>
+"""
+
+# Features overview
+FEATURES_HTML = """
+<div class="feature-card">
+    <h3>🎯 What this tool does:</h3>
+    <ul style="margin: 1rem 0;">
+        <li><strong>🔍 Intelligent Search:</strong> Uses DuckDuckGo to find the most relevant sources</li>
+        <li><strong>📊 Content Analysis:</strong> Extracts and processes content from multiple websites</li>
+        <li><strong>🤖 AI Synthesis:</strong> Uses Google Gemini to create comprehensive reports</li>
+        <li><strong>📄 Professional Output:</strong> Generates both Markdown and PDF reports</li>
+        <li><strong>⚡ Fast & Reliable:</strong> Automated research in minutes, not hours</li>
+    </ul>
+</div>
+"""
+
+# API key setup card
+API_KEY_SETUP_HTML = """
+<div class="feature-card">
+    <h3>� API Key Setup</h3>
+    <p>Get your free Gemini API key from <a href="https://aistudio.google.com/" target="_blank" style="color: #64b5f6;">Google AI Studio</a></p>
+</div>
+"""
+
+# Research tips sidebar
+RESEARCH_TIPS_HTML = """
+<div class="feature-card">
+    <h4>💡 Research Tips:</h4>
+    <ul style="font-size: 0.9rem;">
+        <li><strong>Be Specific:</strong> "AI in healthcare 2024" vs "AI"</li>
+        <li><strong>Include Context:</strong> Add year, location, or specific aspect</li>
+        <li><strong>Ask Questions:</strong> "What is the impact of...?"</li>
+        <li><strong>Current Events:</strong> Include "latest" or "current"</li>
+        <li><strong>Multiple Angles:</strong> "Causes and solutions of..."</li>
+    </ul>
+    <div style="margin-top: 1rem; padding: 0.8rem; background: rgba(76, 175, 80, 0.1); border-radius: 6px; border-left: 3px solid #4caf50;">
+        <strong>📊 Research Power:</strong><br>
+        <small>10+ sources • Topic categorization • Authoritative domains • AI synthesis</small>
+    </div>
+</div>
+"""
+
+# Footer
+FOOTER_HTML = f"""
+<div style="text-align: center; padding: 2rem; color: #7f8c8d; border-top: 1px solid #ecf0f1; margin-top: 3rem;">
+    <p>🔬 <strong>{APP_NAME} {APP_VERSION}</strong> | Advanced AI Research Assistant</p>
+    <p>Powered by Google Gemini AI • Built with ❤️ for researchers worldwide</p>
+</div>
+"""
 
 # Gradio interface with dark theme
 def create_interface():
-    # Dark theme CSS
-    dark_css = """
-    /* Dark theme base */
-    .gradio-container {
-        background: linear-gradient(135deg, #1a1a2e 0%, #16213e 50%, #0f3460 100%) !important;
-        min-height: 100vh;
-        color: white !important;
-        font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-    }
-    
-    /* All blocks and containers */
-    .block, .gr-box, .gr-form, .gr-panel {
-        background: rgba(255, 255, 255, 0.05) !important;
-        border: 1px solid rgba(255, 255, 255, 0.1) !important;
-        border-radius: 15px !important;
-        backdrop-filter: blur(10px) !important;
-        padding: 1.5rem !important;
-        margin: 0.5rem !important;
-    }
-    
-    /* Text colors - ALL WHITE */
-    body, p, span, div, label, h1, h2, h3, h4, h5, h6 {
-        color: white !important;
-    }
-    
-    .gr-markdown, .gr-markdown * {
-        color: white !important;
-        background: transparent !important;
-    }
-    
-    .gr-markdown h1, .gr-markdown h2, .gr-markdown h3 {
-        color: #64b5f6 !important;
-        border-bottom: 1px solid rgba(255, 255, 255, 0.2) !important;
-    }
-    
-    /* Input fields */
-    .gr-textbox, .gr-textbox input, .gr-textbox textarea {
-        background: rgba(255, 255, 255, 0.1) !important;
-        border: 1px solid rgba(255, 255, 255, 0.3) !important;
-        border-radius: 10px !important;
-        color: white !important;
-        padding: 12px !important;
-    }
-    
-    .gr-textbox input::placeholder, .gr-textbox textarea::placeholder {
-        color: rgba(255, 255, 255, 0.6) !important;
-    }
-    
-    .gr-textbox input:focus, .gr-textbox textarea:focus {
-        border-color: #64b5f6 !important;
-        box-shadow: 0 0 10px rgba(100, 181, 246, 0.3) !important;
-        background: rgba(255, 255, 255, 0.15) !important;
-    }
-    
-    /* Buttons */
-    .gr-button {
-        border-radius: 25px !important;
-        padding: 12px 24px !important;
-        font-weight: 600 !important;
-        text-transform: uppercase !important;
-        letter-spacing: 0.5px !important;
-        transition: all 0.3s ease !important;
-        border: none !important;
-        color: white !important;
-    }
-    
-    .gr-button-primary {
-        background: linear-gradient(135deg, #64b5f6, #42a5f5) !important;
-        box-shadow: 0 4px 15px rgba(100, 181, 246, 0.4) !important;
-    }
-    
-    .gr-button-primary:hover {
-        background: linear-gradient(135deg, #42a5f5, #2196f3) !important;
-        transform: translateY(-2px) !important;
-        box-shadow: 0 6px 20px rgba(100, 181, 246, 0.6) !important;
-    }
-    
-    .gr-button-secondary {
-        background: linear-gradient(135deg, #546e7a, #37474f) !important;
-        box-shadow: 0 4px 15px rgba(84, 110, 122, 0.4) !important;
-    }
-    
-    .gr-button-secondary:hover {
-        background: linear-gradient(135deg, #37474f, #263238) !important;
-        transform: translateY(-2px) !important;
-    }
-    
-    /* Accordion */
-    .gr-accordion {
-        background: rgba(255, 255, 255, 0.05) !important;
-        border: 1px solid rgba(255, 255, 255, 0.1) !important;
-        border-radius: 12px !important;
-    }
-    
-    .gr-accordion summary {
-        color: white !important;
-        background: rgba(255, 255, 255, 0.1) !important;
-        padding: 1rem !important;
-        border-radius: 10px !important;
-    }
-    
-    /* Feature cards */
-    .feature-card {
-        background: rgba(100, 181, 246, 0.1) !important;
-        border: 1px solid rgba(100, 181, 246, 0.3) !important;
-        border-radius: 12px !important;
-        padding: 1.5rem !important;
-        margin: 1rem 0 !important;
-        border-left: 4px solid #64b5f6 !important;
-        backdrop-filter: blur(10px) !important;
-    }
-    
-    .feature-card h3, .feature-card h4 {
-        color: #64b5f6 !important;
-        margin-bottom: 1rem !important;
-    }
-    
-    .feature-card ul li {
-        color: rgba(255, 255, 255, 0.9) !important;
-        margin-bottom: 0.5rem !important;
-    }
-    
-    /* Status indicators */
-    .status-success {
-        background: rgba(76, 175, 80, 0.2) !important;
-        border: 1px solid #4caf50 !important;
-        border-left: 4px solid #4caf50 !important;
-        color: #a5d6a7 !important;
-    }
-    
-    .status-error {
-        background: rgba(244, 67, 54, 0.2) !important;
-        border: 1px solid #f44336 !important;
-        border-left: 4px solid #f44336 !important;
-        color: #ef9a9a !important;
-    }
-    
-    /* Hero section */
-    .hero-section {
-        background: linear-gradient(135deg, #1565c0, #1976d2, #1e88e5) !important;
-        border-radius: 15px !important;
-        padding: 2rem !important;
-        margin-bottom: 2rem !important;
-        color: white !important;
-        box-shadow: 0 10px 30px rgba(0, 0, 0, 0.3) !important;
-        text-align: center !important;
-    }
-    
-    /* Download section */
-    .download-section {
-        background: rgba(100, 181, 246, 0.1) !important;
-        border: 1px solid rgba(100, 181, 246, 0.3) !important;
-        border-radius: 12px !important;
-        padding: 1.5rem !important;
-        text-align: center !important;
-        color: white !important;
-    }
-    
-    /* Markdown content area */
-    .gr-markdown {
-        background: rgba(255, 255, 255, 0.05) !important;
-        border: 1px solid rgba(255, 255, 255, 0.1) !important;
-        border-radius: 10px !important;
-        padding: 1.5rem !important;
-        max-height: 500px !important;
-        overflow-y: auto !important;
-    }
-    
-    /* Responsive design */
-    @media (max-width: 768px) {
-        .gradio-container {
-            padding: 0.5rem !important;
-        }
-        
-        .block {
-            margin: 0.25rem !important;
-            padding: 1rem !important;
-        }
-        
-        .hero-section {
-            padding: 1rem !important;
-        }
-        
-        .feature-card {
-            padding: 1rem !important;
-            margin: 0.5rem 0 !important;
-        }
-    }
-    
-    /* Scrollbar styling */
-    ::-webkit-scrollbar {
-        width: 8px;
-    }
-    
-    ::-webkit-scrollbar-track {
-        background: rgba(255, 255, 255, 0.1);
-        border-radius: 4px;
-    }
-    
-    ::-webkit-scrollbar-thumb {
-        background: rgba(100, 181, 246, 0.6);
-        border-radius: 4px;
-    }
-    
-    ::-webkit-scrollbar-thumb:hover {
-        background: rgba(100, 181, 246, 0.8);
-    }
-    """
-    
     with gr.Blocks(
         title=f"{APP_NAME} | Advanced AI Research Assistant",
-        theme=gr.themes.Base(
-            primary_hue="blue",
-            secondary_hue="gray",
-            neutral_hue="slate",
-            text_size="md",
-            radius_size="lg",
-            spacing_size="lg"
-        ).set(
-            body_background_fill="linear-gradient(135deg, #1a1a2e 0%, #16213e 50%, #0f3460 100%)",
-            block_background_fill="rgba(255, 255, 255, 0.05)",
-            block_border_color="rgba(255, 255, 255, 0.1)",
-            block_radius="15px",
-            button_primary_background_fill="linear-gradient(135deg, #64b5f6, #42a5f5)",
-            button_primary_text_color="white",
-            input_background_fill="rgba(255, 255, 255, 0.1)",
-            input_border_color="rgba(255, 255, 255, 0.3)",
-            body_text_color="white",
-            block_label_text_color="white"
-        ),
-        css=dark_css
+        theme=DARK_THEME,
+        css=load_dark_css()
     ) as demo:
         
         # Hero Section
         with gr.Row():
             with gr.Column():
-                gr.HTML(f"""
-                <div class="hero-section">
-                    <h1 style="font-size: 3rem; font-weight: bold; margin: 0; text-shadow: 2px 2px 4px rgba(0,0,0,0.3);">
-                        🔬 {APP_NAME}
-                    </h1>
-                    <h2 style="font-size: 1.5rem; margin: 0.5rem 0; opacity: 0.9;">
-                        {APP_DESCRIPTION}
-                    </h2>
-                    <p style="font-size: 1.1rem; margin: 1rem 0; opacity: 0.8;">
-                        Powered by Google Gemini AI & Advanced Web Research
-                    </p>
-                </div>
-                """)
+                gr.HTML(HERO_HTML)
         
         # Features Overview
         with gr.Row():
             with gr.Column():
-                gr.HTML("""
-                <div class="feature-card">
-                    <h3>🎯 What this tool does:</h3>
-                    <ul style="margin: 1rem 0;">
-                        <li><strong>🔍 Intelligent Search:</strong> Uses DuckDuckGo to find the most relevant sources</li>
-                        <li><strong>📊 Content Analysis:</strong> Extracts and processes content from multiple websites</li>
-                        <li><strong>🤖 AI Synthesis:</strong> Uses Google Gemini to create comprehensive reports</li>
-                        <li><strong>📄 Professional Output:</strong> Generates both Markdown and PDF reports</li>
-                        <li><strong>⚡ Fast & Reliable:</strong> Automated research in minutes, not hours</li>
-                    </ul>
-                </div>
-                """)
+                gr.HTML(FEATURES_HTML)
         
         # Simple API Key Section
         with gr.Row():
             with gr.Column():
-                gr.HTML("""
-                <div class="feature-card">
-                    <h3>� API Key Setup</h3>
-                    <p>Get your free Gemini API key from <a href="https://aistudio.google.com/" target="_blank" style="color: #64b5f6;">Google AI Studio</a></p>
-                </div>
-                """)
+                gr.HTML(API_KEY_SETUP_HTML)
                 
                 with gr.Row():
                     with gr.Column(scale=3):
@@ -1290,22 +1779,7 @@ def create_interface():
                         gr.HTML("<div style='padding: 1rem;'></div>")
             
             with gr.Column(scale=1):
-                gr.HTML("""
-                <div class="feature-card">
-                    <h4>💡 Research Tips:</h4>
-                    <ul style="font-size: 0.9rem;">
-                        <li><strong>Be Specific:</strong> "AI in healthcare 2024" vs "AI"</li>
-                        <li><strong>Include Context:</strong> Add year, location, or specific aspect</li>
-                        <li><strong>Ask Questions:</strong> "What is the impact of...?"</li>
-                        <li><strong>Current Events:</strong> Include "latest" or "current"</li>
-                        <li><strong>Multiple Angles:</strong> "Causes and solutions of..."</li>
-                    </ul>
-                    <div style="margin-top: 1rem; padding: 0.8rem; background: rgba(76, 175, 80, 0.1); border-radius: 6px; border-left: 3px solid #4caf50;">
-                        <strong>📊 Research Power:</strong><br>
-                        <small>10+ sources • Topic categorization • Authoritative domains • AI synthesis</small>
-                    </div>
-                </div>
-                """)
+                gr.HTML(RESEARCH_TIPS_HTML)
         
         # Progress and Results Section
         with gr.Row():
@@ -1334,69 +1808,29 @@ def create_interface():
                         )
                     with gr.Column():
                         download_pdf_btn = gr.DownloadButton(
-                            "📄 Download PDF Report",
+                            PDF_BUTTON_LABEL,
                             visible=False,
                             variant="primary",
                             size="lg"
                         )
         
         # Footer
-        gr.HTML(f"""
-        <div style="text-align: center; padding: 2rem; color: #7f8c8d; border-top: 1px solid #ecf0f1; margin-top: 3rem;">
-            <p>🔬 <strong>{APP_NAME} {APP_VERSION}</strong> | Advanced AI Research Assistant</p>
-            <p>Powered by Google Gemini AI • Built with ❤️ for researchers worldwide</p>
-        </div>
-        """)
+        gr.HTML(FOOTER_HTML)
         
         # Event Handlers
         def validate_key_handler(api_key):
+            message = ''
             if not api_key:
-                return gr.update(
-                    visible=True, 
-                    value='<div class="status-error"><h4>❌ API Key Required</h4><p>Please enter your Gemini API key above.</p></div>'
-                )
-            
-            is_valid, message = validate_api_key(api_key)
-            if is_valid:
-                return gr.update(
-                    visible=True,
-                    value=f'<div class="status-success"><h4>✅ API Key Valid!</h4><p>{message}</p><p>You\'re ready to start researching!</p></div>'
-                )
+                state = 'empty'
             else:
-                return gr.update(
-                    visible=True,
-                    value=f'<div class="status-error"><h4>❌ API Key Issue</h4><div style="white-space: pre-line;">{message}</div></div>'
-                )
-        
-        def research_handler(topic, api_key):
-            if not api_key.strip():
-                return (
-                    "❌ Please enter and validate your Gemini API key first.",
-                    None, None,
-                    gr.update(visible=False),
-                    gr.update(visible=False),
-                    gr.update(visible=False)
-                )
-            
-            if not topic.strip():
-                return (
-                    "❌ Please enter a research topic.",
-                    None, None,
-                    gr.update(visible=False),
-                    gr.update(visible=False),
-                    gr.update(visible=False)
-                )
-            
-            # Show progress
-            progress_msg = f"""
-            <div class="feature-card">
-                <h4>🔄 Research in Progress...</h4>
-                <p>📊 Analyzing: <strong>{topic}</strong></p>
-                <p>⏳ This may take 1-2 minutes. Please wait...</p>
-            </div>
-            """
+                is_valid, message = validate_api_key(api_key)
+                state = 'valid' if is_valid else 'invalid'
             
-            return run_research(topic, api_key)
+            css_class, heading, body = KEY_STATUS_STATES[state]
+            return gr.update(
+                visible=True,
+                value=KEY_STATUS_HTML.format(css_class=css_class, heading=heading, body=body.format(message=html_escape(message)))
+            )
         
         # Wire up events
         validate_btn.click(
@@ -1408,32 +1842,14 @@ def create_interface():
         research_btn.click(
             fn=run_research,
             inputs=[research_topic, gemini_key],
-            outputs=[output, download_md_btn, download_pdf_btn, download_md_btn, download_pdf_btn]
+            outputs=[output, download_md_btn, download_pdf_btn, progress_html]
         )
         
-        # Download handlers
-        def create_md_file(content):
-            if content and content.strip():
-                return content
-            return "No content available"
-        
-        def get_pdf_file(pdf_path):
-            if pdf_path and os.path.exists(pdf_path):
-                return pdf_path
-            return None
-        
-        download_md_btn.click(
-            fn=create_md_file,
-            inputs=[output],
-            outputs=[download_md_btn]
-        )
-        
-        download_pdf_btn.click(
-            fn=get_pdf_file,
-            inputs=[download_pdf_btn],
-            outputs=[download_pdf_btn]
-        )
+        # Both download buttons serve the files run_research set as their values; they need no handlers
     
+    # Research jobs spend nearly all their time waiting on the network or worker threads,
+    # so several can run at once instead of queueing behind each other
+    demo.queue(default_concurrency_limit=RESEARCH_CONCURRENCY, max_size=RESEARCH_QUEUE_SIZE)
     return demo
 
 # Main execution